@@ -1,28 +1,40 @@
 import os
+import hashlib
 import threading
 import queue
+import collections
 import logging
+import log_setup
 import time
-import requests
-from PIL import Image
 from io import BytesIO
-import google.generativeai as genai
-from openai import OpenAI
 from dotenv import load_dotenv
+from provider_resilience import ProviderGuard, ProviderUnavailable
+from art_prompt_cache import ArtPromptCache, dhash
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AIGenerator")
 
 class AIVisualGenerator:
-    def __init__(self, output_dir="../web/visuals/textures"):
+    def __init__(self, output_dir="../web/visuals/textures", url_prefix="visuals/textures",
+                 pool_prompts=None, pool_size=3, pool_budget_per_hour=30):
         self.output_dir = output_dir
+        self.url_prefix = url_prefix  # Where output_dir is reachable on the asset server
         self.queue = queue.Queue()
         self.result_queue = queue.Queue() # For communicating back to main
         self.running = False
+
+        # Pre-warmed texture pool: prefix -> ready texture_ready events.
+        # Refilled in the background while idle so triggers are served instantly.
+        self.pool_prompts = dict(pool_prompts or {})  # prefix -> prompt
+        self.pool_size = pool_size
+        self.pool_budget_per_hour = pool_budget_per_hour
+        self.pool = {prefix: collections.deque() for prefix in self.pool_prompts}
+        self.pool_lock = threading.Lock()
+        self.refill_times = collections.deque()  # Timestamps of refills in the last hour
+        self.refill_job = None  # Thread of the refill in progress (one at a time)
+        self.idle = False
         
         # API Setup
         self.api_key = os.getenv("GOOGLE_API_KEY")
@@ -32,9 +44,45 @@ class AIVisualGenerator:
              self.provider = "openai" if self.api_key else "mock"
         else:
             self.provider = "gemini"
+        # AI_PROVIDER forces one (e.g. openai while a Google key is also set)
+        forced = os.getenv("AI_PROVIDER")
+        if forced:
+            self.provider = forced
+            self.api_key = os.getenv({"gemini": "GOOGLE_API_KEY", "openai": "OPENAI_API_KEY"}.get(forced, ""), "")
+
+        # Every remote call goes through the guard: hard timeouts, rate limit, adaptive
+        # concurrency and a circuit breaker that sends triggers to the local fallback
+        self.connect_timeout = float(os.getenv("AI_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(os.getenv("AI_READ_TIMEOUT", "45"))
+        # How long a request whose stage is ready queues for a busy provider slot before falling back
+        self.slot_wait = float(os.getenv("AI_SLOT_WAIT", "0.5"))
+        self.guard = ProviderGuard(
+            self.provider,
+            timeout=self.connect_timeout + self.read_timeout,
+            rate_per_minute=float(os.getenv("AI_RATE_PER_MINUTE", "10")),
+            max_concurrency=int(os.getenv("AI_MAX_CONCURRENCY", "2")),
+        )
+        # Gemini's vision stage has its own limits, so the art prompt for the next request
+        # can be written while Imagen is still busy with the previous one
+        self.vision_guard = ProviderGuard(
+            f"{self.provider}-vision",
+            timeout=self.connect_timeout + self.read_timeout,
+            rate_per_minute=float(os.getenv("AI_RATE_PER_MINUTE", "10")),
+            max_concurrency=int(os.getenv("AI_MAX_CONCURRENCY", "2")),
+        )
+        # Art prompts for scenes seen recently (perceptual hash match) skip the vision call
+        self.art_prompts = ArtPromptCache(ttl=float(os.getenv("ART_PROMPT_TTL", "600")))
+        self.imagen_model = os.getenv("IMAGEN_MODEL", "imagen-4.0-generate-001")
 
+        # Provider SDKs are imported lazily so mock mode (and startup) doesn't pay for them
         if self.provider == "gemini":
-            genai.configure(api_key=self.api_key)
+            import google.generativeai as genai
+            # GEMINI_API_ENDPOINT points the SDK elsewhere, e.g. fake_ai_provider.py for load tests
+            endpoint = os.getenv("GEMINI_API_ENDPOINT")
+            if endpoint:
+                genai.configure(api_key=self.api_key, transport="rest", client_options={"api_endpoint": endpoint})
+            else:
+                genai.configure(api_key=self.api_key)
             # Use Gemini 2.5 Flash (Nano Banana) for speed and quality
             # Fallback to 1.5 if 2.5 not available in this specific call context, but we try 2.5 first
             try:
@@ -45,47 +93,110 @@ class AIVisualGenerator:
                 logger.info("Using Gemini 1.5 Flash (Fallback)")
 
         elif self.provider == "openai":
-            self.client = OpenAI(api_key=self.api_key)
+            import httpx
+            from openai import OpenAI
+            # No SDK retries: the guard decides when to try again
+            self.client = OpenAI(api_key=self.api_key, max_retries=0, base_url=os.getenv("OPENAI_BASE_URL"),
+                                 timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout))
+
+        # Liveness info for the Supervisor
+        self.last_heartbeat = time.time()  # Updated every loop iteration (at least once a second when idle)
+        self.generation = 0  # Bumped on restart so an abandoned thread exits
+        self.thread = None
 
         # Ensure output directory exists
         os.makedirs(self.output_dir, exist_ok=True)
 
     def start(self):
         self.running = True
-        self.thread = threading.Thread(target=self._run_loop)
+        self.last_heartbeat = time.time()
+        self.thread = threading.Thread(target=self._run_loop, args=(self.generation,), name="AIVisualGenerator")
         self.thread.daemon = True
         self.thread.start()
         logger.info(f"AI Generator started using provider: {self.provider}")
 
     def stop(self):
         self.running = False
-        if self.thread.is_alive():
-            self.thread.join()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
         logger.info("AI Generator stopped.")
 
+    def is_alive(self):
+        return self.running and self.thread is not None and self.thread.is_alive()
+
+    def restart(self):
+        """Abandons a stuck generation thread and starts a fresh one on the same queue."""
+        self.generation += 1
+        self.start()
+        logger.info(f"AI Generator restarted (generation {self.generation}).")
+
     def request_generation(self, prompt, filename_prefix="gen", source_image=None):
         """
         source_image: Optional PIL Image for image-to-image transformation
+
+        Text-only requests for a pooled prefix are answered straight from the
+        pool when a texture is ready; otherwise they are generated live.
         """
+        if source_image is None:
+            with self.pool_lock:
+                pooled = self.pool.get(filename_prefix)
+                event = pooled.popleft() if pooled else None
+            if event:
+                logger.info(f"Serving {filename_prefix} texture from pool ({len(pooled)} left)")
+                self.result_queue.put(event)
+                return
         self.queue.put((prompt, filename_prefix, source_image))
 
+    def set_idle(self, idle):
+        """Tells the generator whether nobody is in frame, which allows pool refills."""
+        self.idle = idle
+
+    def pool_levels(self):
+        with self.pool_lock:
+            return {prefix: len(events) for prefix, events in self.pool.items()}
+
+    def provider_status(self):
+        return dict(self.guard.status(), provider=self.provider, vision=self.vision_guard.status(),
+                    art_prompt_cache=self.art_prompts.stats())
+
     def _generate_gemini_imagen(self, prompt, source_image):
         """
         Use Google's latest Imagen 4.0 via Vertex AI or the generativeai library.
+        With a source image, Gemini first writes an art prompt for the scene
+        (or reuses the cached one of a similar scene); without one, the request
+        prompt is sent to Imagen as-is.
+        Requests run on their own threads and the two stages have separate
+        guards, so concurrent requests pipeline: one is in the vision stage while
+        another is in Imagen, and a request whose prompt is ready queues briefly
+        (AI_SLOT_WAIT) for an Imagen slot instead of falling back at once.
+        Errors propagate so _generate() can fall back (and the guard can count them).
         """
+        art_prompt = prompt
+        if source_image:
+            scene_hash = dhash(source_image)
+            art_prompt = self.art_prompts.get(scene_hash)
+            if art_prompt is None:
+                art_prompt = self.vision_guard.call(self._generate_art_prompt, source_image,
+                                                    slot_wait=self.slot_wait)
+                self.art_prompts.put(scene_hash, art_prompt)
+            else:
+                logger.info("Reusing cached art prompt for a similar scene")
+        return self.guard.call(self._generate_imagen, art_prompt, slot_wait=self.slot_wait)
+
+    def _generate_art_prompt(self, source_image):
+        import google.generativeai as genai
+
+        # 1. Use Gemini 2.5 Flash (Nano Banana) to create the artistic prompt
+        # This model is much faster and better at visual understanding
+        vision_model_name = 'gemini-2.5-flash-preview-09-2025' 
+        # Fallback to 1.5 if 2.5 not found, but list_models confirmed it exists
+        
         try:
-            if source_image:
-                # 1. Use Gemini 2.5 Flash (Nano Banana) to create the artistic prompt
-                # This model is much faster and better at visual understanding
-                vision_model_name = 'gemini-2.5-flash-preview-09-2025' 
-                # Fallback to 1.5 if 2.5 not found, but list_models confirmed it exists
-                
-                try:
-                    vision_model = genai.GenerativeModel(vision_model_name)
-                except:
-                    vision_model = self.model # Fallback to initialized model (1.5)
+            vision_model = genai.GenerativeModel(vision_model_name)
+        except:
+            vision_model = self.model # Fallback to initialized model (1.5)
 
-                vision_prompt = """You are an AI art director. Analyze this image and create a detailed, vivid prompt for Imagen 4.0 to transform this scene into a stunning cyberpunk/neon artistic masterpiece. 
+        vision_prompt = """You are an AI art director. Analyze this image and create a detailed, vivid prompt for Imagen 4.0 to transform this scene into a stunning cyberpunk/neon artistic masterpiece. 
 
 Include specific details about:
 - Neon color palette (cyan, magenta, purple, electric blue)
@@ -96,55 +207,34 @@ Include specific details about:
 
 Keep the prompt under 100 words and make it extremely visual and specific."""
 
-                response = vision_model.generate_content([vision_prompt, source_image])
-                art_prompt = response.text.strip()
-                
-                logger.info(f"Generated art prompt: {art_prompt[:100]}...")
-                
-                # 2. Use Imagen 4.0 for generation
-                # Based on list_models, we have 'imagen-4.0-generate-001'
-                try:
-                    from google.generativeai import ImageGenerationModel
-                    
-                    # Try Imagen 4.0 first
-                    model_names = [
-                        "imagen-4.0-generate-001",
-                        "imagen-4.0-fast-generate-001", # Faster?
-                        "imagen-3.0-generate-001"       # Fallback
-                    ]
-                    
-                    result = None
-                    for name in model_names:
-                        try:
-                            logger.info(f"Attempting generation with {name}...")
-                            imagen_model = ImageGenerationModel(name)
-                            result = imagen_model.generate_images(
-                                prompt=art_prompt,
-                                number_of_images=1,
-                                aspect_ratio="1:1" # or "16:9" if supported
-                            )
-                            if result:
-                                break
-                        except Exception as e:
-                            logger.warning(f"Failed with {name}: {e}")
-                            continue
-
-                    if result and result.images:
-                        # Convert to bytes
-                        img_bytes = result.images[0]._pil_image
-                        buf = BytesIO()
-                        img_bytes.save(buf, format="PNG")
-                        return buf.getvalue()
-                        
-                except (ImportError, AttributeError, Exception) as e:
-                    logger.warning(f"Imagen generation failed: {e}")
-                    # Fallback to style transfer
-                    return self._generate_enhanced_style_transfer(source_image, art_prompt)
-
-            return None
-        except Exception as e:
-            logger.error(f"Gemini Imagen Error: {e}")
-            return None
+        response = vision_model.generate_content([vision_prompt, source_image],
+                                                 request_options={"timeout": self.read_timeout})
+        art_prompt = response.text.strip()
+        
+        logger.info(f"Generated art prompt: {art_prompt[:100]}...")
+        return art_prompt
+
+    def _generate_imagen(self, art_prompt):
+        # 2. Use Imagen 4.0 for generation (IMAGEN_MODEL to pick another, e.g. imagen-4.0-fast-generate-001).
+        # One model only: cascading through several on every failure multiplied the wait during outages.
+        from google.generativeai import ImageGenerationModel
+
+        logger.info(f"Generating with {self.imagen_model}...")
+        imagen_model = ImageGenerationModel(self.imagen_model)
+        result = imagen_model.generate_images(
+            prompt=art_prompt,
+            number_of_images=1,
+            aspect_ratio="1:1", # or "16:9" if supported
+            request_options={"timeout": self.read_timeout}  # Don't let a hung request hold its slot forever
+        )
+        if not result or not result.images:
+            raise RuntimeError(f"{self.imagen_model} returned no image")
+
+        # Convert to bytes
+        img_bytes = result.images[0]._pil_image
+        buf = BytesIO()
+        img_bytes.save(buf, format="PNG")
+        return buf.getvalue()
 
     def _generate_enhanced_style_transfer(self, source_image, prompt):
         """
@@ -180,21 +270,27 @@ Keep the prompt under 100 words and make it extremely visual and specific."""
         return None
 
     def _generate_openai(self, prompt):
-        try:
-            # DALL-E 3
-            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY") or self.api_key)
-            response = client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1,
-            )
-            image_url = response.data[0].url
-            return requests.get(image_url).content
-        except Exception as e:
-            logger.error(f"OpenAI Generation Error: {e}")
-            return None
+        # DALL-E 3
+        response = self.guard.call(
+            self.client.images.generate,
+            model="dall-e-3",
+            prompt=prompt,
+            size="1024x1024",
+            quality="standard",
+            n=1,
+        )
+        image_url = response.data[0].url
+        # Outside the guard: the image is already paid for, so the download must not need a
+        # rate-limit token or a free slot, and a failed fetch says nothing about DALL-E's health
+        return self._download(image_url)
+
+    def _download(self, url):
+        """Fetches a generated image, bounded by its own connect/read timeouts."""
+        import requests
+
+        response = requests.get(url, timeout=(self.connect_timeout, self.read_timeout))
+        response.raise_for_status()
+        return response.content
 
     def _generate_mock(self, prompt, source_image=None):
         # Mock style transfer: just invert colors or apply colormap
@@ -211,67 +307,147 @@ Keep the prompt under 100 words and make it extremely visual and specific."""
                 return buffer.tobytes()
         
         # Fallback
+        from PIL import Image
         img = Image.new('RGB', (512, 512), color=(100, 50, 150))
         buf = BytesIO()
         img.save(buf, format="PNG")
         return buf.getvalue()
 
-    def _run_loop(self):
-        while self.running:
+    def _generate(self, prompt, source_image=None, fallback=True):
+        """
+        Runs the configured provider and returns (PNG bytes, source), source
+        being "provider", "fallback" or "mock". If the provider fails or is
+        unavailable, returns the local style transfer (with a source image) or
+        mock texture instead, or (None, None) when fallback=False.
+        """
+        if self.provider == "mock":
+            return self._generate_mock(prompt, source_image), "mock"
+
+        try:
+            if self.provider == "gemini":
+                # Use Gemini + Imagen pipeline
+                return self._generate_gemini_imagen(prompt, source_image), "provider"
+            # OpenAI doesn't do img2img in DALL-E 3 API directly (it does in DALL-E 2 but 3 is better).
+            # For now, simple text gen.
+            return self._generate_openai(prompt), "provider"
+        except ProviderUnavailable as e:
+            # Circuit open / rate limited: degrade right away instead of waiting on the provider
+            logger.warning(f"{e}; using local fallback")
+        except Exception as e:
+            logger.error(f"{self.provider} generation failed: {e}")
+
+        if not fallback:
+            return None, None
+        if source_image:
+            return self._generate_enhanced_style_transfer(source_image, prompt), "fallback"
+        return self._generate_mock(prompt), "fallback"
+
+    def _save_texture(self, image_data, prefix, source):
+        """
+        Writes the image under a content-hashed name so the asset server can
+        serve it as immutable, and returns the `texture_ready` event for it
+        (`source` says where the image came from, see _generate()).
+        """
+        digest = hashlib.sha256(image_data).hexdigest()[:16]
+        filename = f"{prefix}_{digest}.png"
+        filepath = os.path.join(self.output_dir, filename)
+
+        if not os.path.exists(filepath):
+            # Write then rename so a half-written file is never served
+            tmp_path = filepath + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image_data)
+            os.replace(tmp_path, filepath)
+        logger.info(f"Image saved to {filepath}")
+
+        return {
+            "type": "texture_ready",
+            "filename": filename,
+            "prefix": prefix,
+            "url": f"{self.url_prefix}/{filename}",
+            "source": source
+        }
+
+    def get_results(self):
+        """Returns all finished generation events without blocking."""
+        results = []
+        while True:
+            try:
+                results.append(self.result_queue.get_nowait())
+            except queue.Empty:
+                return results
+
+    def _run_loop(self, generation):
+        while self.running and generation == self.generation:
+            self.last_heartbeat = time.time()
             try:
                 prompt, prefix, source_image = self.queue.get(timeout=1)
                 logger.info(f"Processing generation request: {prefix}")
-                
-                timestamp = int(time.time())
-                filename = f"{prefix}_{timestamp}.png"
-                filepath = os.path.join(self.output_dir, filename)
-
-                image_data = None
-                
-                if self.provider == "gemini":
-                    # Use Gemini + Imagen pipeline
-                    image_data = self._generate_gemini_imagen(prompt, source_image)
-                    
-                    if not image_data:
-                        # If Imagen fails, use enhanced style transfer
-                        logger.warning("Imagen generation failed. Using enhanced style transfer.")
-                        image_data = self._generate_enhanced_style_transfer(source_image, prompt)
-
-                elif self.provider == "openai":
-                    if source_image:
-                         # OpenAI doesn't do img2img in DALL-E 3 API directly (it does in DALL-E 2 but 3 is better).
-                         # We can describe it first or just use text.
-                         # Let's use Mock for img2img or DALL-E 2 variations if needed.
-                         # For now, simple text gen.
-                         image_data = self._generate_openai(prompt)
-                    else:
-                         image_data = self._generate_openai(prompt)
-                else:
-                    image_data = self._generate_mock(prompt, source_image)
-
-                if image_data:
-                    with open(filepath, "wb") as f:
-                        f.write(image_data)
-                    logger.info(f"Image saved to {filepath}")
-                    
-                    # Notify via a queue or callback that main.py can pick up?
-                    # Or just return it? This runs in a thread.
-                    # We need a way to tell the main loop.
-                    # Let's put it in a "result_queue"
-                    if not hasattr(self, 'result_queue'):
-                        self.result_queue = queue.Queue()
-                    self.result_queue.put({
-                        "type": "texture_ready",
-                        "filename": filename,
-                        "prefix": prefix
-                    })
-                
+
+                # Each request runs on its own thread; the guard bounds how many reach the provider
+                job = threading.Thread(target=self._process_request, args=(prompt, prefix, source_image),
+                                       name="AIVisualGenerator")
+                job.daemon = True
+                job.start()
+
             except queue.Empty:
-                continue
+                # Nothing requested: use the quiet time to top up the pool
+                try:
+                    self._refill_pool()
+                except Exception as e:
+                    logger.error(f"Error refilling texture pool: {e}")
             except Exception as e:
                 logger.error(f"Error during generation loop: {e}")
 
+    def _process_request(self, prompt, prefix, source_image):
+        try:
+            image_data, source = self._generate(prompt, source_image)
+            if image_data:
+                self.result_queue.put(self._save_texture(image_data, prefix, source))
+        except Exception as e:
+            logger.error(f"Error generating {prefix}: {e}")
+
+    def _refill_pool(self):
+        """
+        Starts generating one pooled texture if idle, below target, within the
+        hourly budget and no refill is running. Runs on its own thread like a
+        request, so the dispatcher never waits on a refill to pick up a trigger.
+        """
+        if not self.idle or not self.pool_prompts or self.provider == "mock":
+            return  # Mock textures aren't worth pooling (or spending the refill budget on)
+        if self.refill_job is not None and self.refill_job.is_alive():
+            return
+
+        now = time.time()
+        while self.refill_times and now - self.refill_times[0] > 3600:
+            self.refill_times.popleft()
+        if len(self.refill_times) >= self.pool_budget_per_hour:
+            return
+
+        levels = self.pool_levels()
+        prefix = min(levels, key=levels.get)
+        if levels[prefix] >= self.pool_size:
+            return
+
+        self.refill_times.append(now)
+        logger.info(f"Refilling texture pool: {prefix} ({levels[prefix]}/{self.pool_size})")
+        self.refill_job = threading.Thread(target=self._refill, args=(prefix,), name="AIVisualGenerator")
+        self.refill_job.daemon = True
+        self.refill_job.start()
+
+    def _refill(self, prefix):
+        try:
+            # Mock textures aren't worth pooling; skip the refill while the provider is down
+            image_data, source = self._generate(self.pool_prompts[prefix], fallback=False)
+            if image_data:
+                event = self._save_texture(image_data, prefix, source)
+                with self.pool_lock:
+                    self.pool[prefix].append(event)
+        except Exception as e:
+            logger.error(f"Error refilling texture pool: {e}")
+
 if __name__ == "__main__":
+    log_setup.configure()
     # Test
     gen = AIVisualGenerator()
     gen.start()
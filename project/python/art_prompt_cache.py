@@ -0,0 +1,94 @@
+"""
+Cache of Gemini art-direction prompts keyed by a perceptual hash of the scene.
+
+The vision call that writes an art prompt for a camera frame takes a second
+or two, and consecutive triggers usually show nearly the same scene (same
+stage, same lighting, a performer in a similar spot). dhash() reduces a frame
+to 64 bits that barely change under noise, compression or small movements;
+ArtPromptCache returns the prompt of any entry within a few bits of Hamming
+distance that is younger than its TTL, so only genuinely new scenes pay for
+the vision call.
+"""
+
+import threading
+import time
+import collections
+import logging
+import log_setup
+import numpy as np
+import cv2
+
+logger = logging.getLogger("ArtPromptCache")
+
+
+def dhash(image, size=8):
+    """64-bit difference hash of a PIL image or RGB/gray array: sign of horizontal gradients on a 9x8 thumbnail."""
+    pixels = np.asarray(image)
+    if pixels.ndim == 3:
+        pixels = cv2.cvtColor(pixels[:, :, :3], cv2.COLOR_RGB2GRAY)
+    thumbnail = cv2.resize(pixels, (size + 1, size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class ArtPromptCache:
+    def __init__(self, ttl=600.0, max_distance=5, max_entries=128):
+        self.ttl = ttl
+        self.max_distance = max_distance  # Differing hash bits still counted as the same scene
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()  # hash -> (prompt, stored_at), oldest first
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, image_hash):
+        """Prompt of the closest fresh entry within max_distance bits, or None."""
+        with self.lock:
+            now = time.monotonic()
+            while self.entries and now - next(iter(self.entries.values()))[1] > self.ttl:
+                self.entries.popitem(last=False)
+
+            best, best_distance = None, self.max_distance + 1
+            for key, (prompt, _) in self.entries.items():
+                distance = (key ^ image_hash).bit_count()
+                if distance < best_distance:
+                    best, best_distance = prompt, distance
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return best
+
+    def put(self, image_hash, prompt):
+        with self.lock:
+            self.entries.pop(image_hash, None)
+            self.entries[image_hash] = (prompt, time.monotonic())
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    # A slightly moved, noisy copy of a scene hits the cache; a different scene misses
+    def stage(x):
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        frame[:] = np.linspace(40, 160, 640, dtype=np.uint8)[None, :, None]  # Lighting gradient
+        cv2.rectangle(frame, (x, 120), (x + 120, 460), (220, 200, 180), -1)  # Performer
+        return frame
+
+    rng = np.random.default_rng(0)
+    scene = stage(260)
+    noisy = np.clip(stage(270) + rng.normal(0, 6, scene.shape), 0, 255).astype(np.uint8)
+    other = stage(40)[:, ::-1]
+
+    cache = ArtPromptCache()
+    cache.put(dhash(scene), "neon skyline")
+    logger.info(f"noisy copy: {cache.get(dhash(noisy))!r} "
+                f"({(dhash(scene) ^ dhash(noisy)).bit_count()} bits apart)")
+    logger.info(f"other scene: {cache.get(dhash(other))!r} "
+                f"({(dhash(scene) ^ dhash(other)).bit_count()} bits apart)")
+    logger.info(f"stats: {cache.stats()}")
@@ -0,0 +1,207 @@
+import asyncio
+import collections
+import gzip
+import hashlib
+import logging
+import log_setup
+import mimetypes
+import os
+from email.utils import formatdate
+from urllib.parse import unquote
+
+logger = logging.getLogger("AssetServer")
+
+# Content types worth compressing (images/audio are already compressed)
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_GZIP_SIZE = 512
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+STATUS_TEXT = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("text/css", ".css")
+
+
+class CachedAsset:
+    def __init__(self, mtime_ns, size, body, content_type):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.gzipped = None
+        self.gzip_etag = None  # Each encoding has its own ETag, so caches never swap one body for the other
+        if content_type.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_GZIP_SIZE:
+            self.gzipped = gzip.compress(body, compresslevel=6)
+            self.gzip_etag = self.etag[:-1] + '-gz"'
+        self.nbytes = len(body) + len(self.gzipped or b"")
+
+
+class AssetServer:
+    """
+    Small HTTP/1.1 static server that shares the asyncio loop with the
+    WebSocket server, replacing the separate `python -m http.server`.
+
+    - Files under `immutable_prefixes` are content-hashed (see
+      AIVisualGenerator) and served with `Cache-Control: immutable`.
+    - Everything else is revalidated with an ETag and gzipped when the
+      client accepts it.
+    - Bodies are kept in memory up to `max_cache_bytes`, least recently
+      used first out, since new textures keep arriving during a show.
+    """
+
+    def __init__(self, root="../web", host="localhost", port=8000,
+                 immutable_prefixes=("/visuals/textures/",), max_cache_bytes=64 * 1024 * 1024):
+        self.root = os.path.realpath(root)
+        self.host = host
+        self.port = port
+        self.immutable_prefixes = tuple(immutable_prefixes)
+        self.routes = {}  # path -> async handler(writer, headers, method)
+        self.max_cache_bytes = max_cache_bytes
+        self._cache = collections.OrderedDict()  # absolute path -> CachedAsset, least recently used first
+        self._cache_bytes = 0
+
+    def add_route(self, path, handler):
+        """Registers a dynamic handler that takes over the connection for `path`."""
+        self.routes[path] = handler
+
+    async def start(self):
+        logger.info(f"Starting asset server on http://{self.host}:{self.port} (root: {self.root})")
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._send(writer, 400, {}, b"", close=True)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                path = unquote(target.split("?", 1)[0])
+                keep_alive = (version == "HTTP/1.1"
+                              and headers.get("connection", "").lower() != "close")
+
+                if path in self.routes:
+                    # Dynamic routes (e.g. streams) own the connection until they return
+                    await self.routes[path](writer, headers, method)
+                    break
+
+                if method not in ("GET", "HEAD"):
+                    await self._send(writer, 405, {"Allow": "GET, HEAD"}, b"", close=True)
+                    break
+
+                await self._serve_file(writer, path, headers, method == "HEAD", keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.warning(f"Asset request failed: {e}")
+        finally:
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _serve_file(self, writer, path, headers, head_only, keep_alive):
+        if path.endswith("/"):
+            path += "index.html"
+        full_path = os.path.realpath(os.path.join(self.root, path.lstrip("/")))
+        if not full_path.startswith(self.root + os.sep) or not os.path.isfile(full_path):
+            await self._send(writer, 404, {}, b"Not Found", close=not keep_alive)
+            return
+
+        asset = await self._load(full_path)
+        use_gzip = asset.gzipped is not None and "gzip" in headers.get("accept-encoding", "")
+        etag = asset.gzip_etag if use_gzip else asset.etag
+
+        response_headers = {
+            "ETag": etag,
+            "Cache-Control": (IMMUTABLE_CACHE_CONTROL if path.startswith(self.immutable_prefixes)
+                              else REVALIDATE_CACHE_CONTROL),
+        }
+        if asset.gzipped is not None:
+            response_headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = [tag.strip() for tag in headers.get("if-none-match", "").split(",")]
+        if etag in if_none_match or "*" in if_none_match:
+            await self._send(writer, 304, response_headers, b"", close=not keep_alive)
+            return
+
+        body = asset.body
+        if use_gzip:
+            body = asset.gzipped
+            response_headers["Content-Encoding"] = "gzip"
+        response_headers["Content-Type"] = asset.content_type
+
+        await self._send(writer, 200, response_headers, body,
+                         close=not keep_alive, head_only=head_only)
+
+    async def _load(self, full_path):
+        """Returns the cached asset, re-reading it only when the file changed on disk."""
+        stat = os.stat(full_path)
+        asset = self._cache.get(full_path)
+        if asset and asset.mtime_ns == stat.st_mtime_ns and asset.size == stat.st_size:
+            self._cache.move_to_end(full_path)
+            return asset
+
+        content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+        def read():
+            with open(full_path, "rb") as f:
+                return CachedAsset(stat.st_mtime_ns, stat.st_size, f.read(), content_type)
+
+        # Reading and compressing happens off the loop so broadcasts are not delayed
+        asset = await asyncio.get_running_loop().run_in_executor(None, read)
+        old = self._cache.pop(full_path, None)
+        if old:
+            self._cache_bytes -= old.nbytes
+        if asset.nbytes <= self.max_cache_bytes:
+            self._cache[full_path] = asset
+            self._cache_bytes += asset.nbytes
+            while self._cache_bytes > self.max_cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted.nbytes
+        return asset
+
+    async def _send(self, writer, status, headers, body, close=False, head_only=False):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                 f"Date: {formatdate(usegmt=True)}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'close' if close else 'keep-alive'}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if body and not head_only and status != 304:
+            writer.write(body)
+        await writer.drain()
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    server = AssetServer()
+    try:
+        asyncio.run(server.start())
+    except KeyboardInterrupt:
+        pass
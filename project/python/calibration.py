@@ -0,0 +1,196 @@
+"""
+Camera -> projector calibration.
+
+Trackers report normalized camera coordinates. A Calibration maps them to
+normalized projector coordinates (0..1 across the projected canvas) with a
+homography, optionally undistorting the lens first. main.py applies it to
+every landmark of a frame in one vectorized transform before publishing, so
+clients just scale by their canvas size.
+
+The homography is solved from clicked correspondences: the projector shows
+crosshairs at CALIBRATION_TARGETS one at a time and the operator clicks
+where each one appears in the camera image (`python camera_viewer.py
+--calibrate`). The result is saved to calibration.json.
+"""
+
+import json
+import logging
+import os
+import numpy as np
+import cv2
+from silhouette import decode_contours, encode_contours
+
+logger = logging.getLogger("Calibration")
+
+# Projector-space targets shown during calibration (3x3 grid, inset from the edges)
+CALIBRATION_TARGETS = [[x, y] for y in (0.1, 0.5, 0.9) for x in (0.1, 0.5, 0.9)]
+
+# The [x, y] keypoints of a pose dict (pose_tracking.KEYPOINTS, without importing
+# MediaPipe). Only these are mapped; other lists such as multi_camera's "cameras" aren't points.
+POSE_KEYPOINTS = ("nose", "left_wrist", "right_wrist", "left_index", "right_index", "left_shoulder", "right_shoulder")
+
+
+class Calibration:
+    def __init__(self, homography=None, camera_matrix=None, dist_coeffs=None, image_size=None):
+        self.homography = np.eye(3) if homography is None else np.asarray(homography, dtype=np.float64)
+        # Optional lens model (cv2.calibrateCamera output) in pixels of an image_size (w, h) frame
+        self.camera_matrix = None if camera_matrix is None else np.asarray(camera_matrix, dtype=np.float64)
+        self.dist_coeffs = None if dist_coeffs is None else np.asarray(dist_coeffs, dtype=np.float64)
+        self.image_size = None if image_size is None else np.asarray(image_size, dtype=np.float64)
+        self.cache = {}  # kind -> (input object, mapped output); the loop republishes the same pose
+
+    @property
+    def is_identity(self):
+        return self.camera_matrix is None and np.allclose(self.homography, np.eye(3))
+
+    @classmethod
+    def load(cls, path="calibration.json"):
+        if not os.path.exists(path):
+            logger.info(f"No calibration at {path}; using camera coordinates")
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        logger.info(f"Loaded calibration from {path}")
+        return cls(data["homography"], data.get("camera_matrix"), data.get("dist_coeffs"), data.get("image_size"))
+
+    def save(self, path="calibration.json"):
+        data = {"homography": self.homography.tolist()}
+        if self.camera_matrix is not None:
+            data.update(camera_matrix=self.camera_matrix.tolist(), dist_coeffs=self.dist_coeffs.tolist(),
+                        image_size=self.image_size.tolist())
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+        logger.info(f"Calibration saved to {path}")
+
+    @classmethod
+    def from_correspondences(cls, camera_points, projector_points, camera_matrix=None, dist_coeffs=None,
+                             image_size=None):
+        """
+        Solves the homography from >= 4 (camera, projector) point pairs, both
+        normalized. Returns (Calibration, RMS reprojection error in projector units).
+        """
+        calibration = cls(camera_matrix=camera_matrix, dist_coeffs=dist_coeffs, image_size=image_size)
+        source = calibration._undistort(np.asarray(camera_points, dtype=np.float64))
+        target = np.asarray(projector_points, dtype=np.float64)
+        if len(source) < 4:
+            raise ValueError("Need at least 4 correspondences")
+
+        homography, _ = cv2.findHomography(source, target, cv2.RANSAC if len(source) > 4 else 0, 0.02)
+        if homography is None:
+            raise ValueError("Correspondences are degenerate (collinear or repeated points)")
+        calibration.homography = homography
+        error = np.sqrt(np.mean(np.sum((calibration.transform(camera_points) - target) ** 2, axis=1)))
+        return calibration, float(error)
+
+    def _undistort(self, points):
+        if self.camera_matrix is None:
+            return points
+        pixels = (points * self.image_size).reshape(-1, 1, 2)
+        undistorted = cv2.undistortPoints(pixels, self.camera_matrix, self.dist_coeffs, P=self.camera_matrix)
+        return undistorted.reshape(-1, 2) / self.image_size
+
+    def transform(self, points):
+        """Maps an (N, 2) array of normalized camera points to normalized projector points."""
+        points = self._undistort(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+        mapped = points @ self.homography[:, :2].T + self.homography[:, 2]
+        return mapped[:, :2] / mapped[:, 2:3]
+
+    def _cached(self, kind, value, mapper):
+        if value is None or self.is_identity:
+            return value
+        cached = self.cache.get(kind)
+        if cached and cached[0] is value:
+            return cached[1]
+        mapped = mapper(value)
+        self.cache[kind] = (value, mapped)
+        return mapped
+
+    def map_pose(self, pose):
+        """Returns a copy of a pose dict (incl. its "people" list) with every POSE_KEYPOINTS point mapped."""
+        def mapper(pose):
+            people = pose.get("people", [pose])
+            names = [name for name in POSE_KEYPOINTS if name in pose]
+            points = [person[name] for person in people for name in names]
+            mapped = self.transform(points).reshape(len(people), len(names), 2).tolist()
+            copies = [dict(person, **dict(zip(names, person_points))) for person, person_points in zip(people, mapped)]
+            return dict(copies[0], people=copies) if "people" in pose else copies[0]
+        return self._cached("pose", pose, mapper)
+
+    def map_hands(self, hands_data):
+        def mapper(hands_data):
+            hands = hands_data.get("hands", [])
+            mapped = self.transform([hand["index_tip"] for hand in hands]).tolist() if hands else []
+            return dict(hands_data, hands=[dict(hand, index_tip=point) for hand, point in zip(hands, mapped)])
+        return self._cached("hands", hands_data, mapper)
+
+    def map_silhouette(self, silhouette):
+        def mapper(silhouette):
+            contours = decode_contours(silhouette["contours"])
+            if not contours:
+                return silhouette
+            mapped = np.clip(self.transform(np.concatenate(contours)), 0.0, 1.0)
+            splits = np.cumsum([len(c) for c in contours])[:-1]
+            return dict(silhouette, contours=encode_contours(np.split(mapped, splits)))
+        return self._cached("silhouette", silhouette, mapper)
+
+
+class CalibrationService:
+    """
+    Handles {"type": "calibration", ...} control messages (sent by
+    camera_viewer.py --calibrate) and relays crosshair targets to displays:
+      {"action": "target", "index": 3}       -> displays show CALIBRATION_TARGETS[3]
+      {"action": "end"}                      -> displays hide the crosshair
+      {"action": "solve", "camera_points": [...], "projector_points": [...],
+       "camera_matrix"?, "dist_coeffs"?, "image_size"?}
+      {"action": "reset"}                    -> back to raw camera coordinates
+    With several cameras (multi_camera.CameraRig), messages carrying
+    "camera": i calibrate that camera's camera->stage transform instead, and
+    "target" also switches the debug preview to that camera.
+    """
+
+    def __init__(self, server, path="calibration.json", rig=None):
+        self.server = server
+        self.path = path
+        self.rig = rig
+        self.calibration = Calibration.load(path)
+
+    async def handle_control(self, websocket, data):
+        action = data.get("action")
+        camera = data.get("camera") if self.rig else None
+        if camera is not None and not 0 <= camera < len(self.rig.transforms):
+            await websocket.send(json.dumps({"type": "calibration", "status": "failed",
+                                             "error": f"No camera {camera}"}))
+            return
+
+        if action == "target":
+            if camera is not None:
+                self.rig.preview_camera = camera
+            await self.server.broadcast({"type": "calibration", "targets": CALIBRATION_TARGETS,
+                                         "active": data.get("index")})
+        elif action == "end":
+            await self.server.broadcast({"type": "calibration", "targets": CALIBRATION_TARGETS, "active": None})
+        elif action == "solve":
+            try:
+                calibration, error = Calibration.from_correspondences(
+                    data["camera_points"], data["projector_points"],
+                    data.get("camera_matrix"), data.get("dist_coeffs"), data.get("image_size"))
+            except (KeyError, ValueError) as e:
+                await websocket.send(json.dumps({"type": "calibration", "status": "failed", "error": str(e)}))
+                return
+            if camera is not None:
+                self.rig.set_transform(camera, calibration)
+            else:
+                calibration.save(self.path)
+                self.calibration = calibration
+            logger.info(f"New calibration applied (RMS error {error:.4f})")
+            await websocket.send(json.dumps({"type": "calibration", "status": "saved", "rms_error": error}))
+        elif action == "reset":
+            if camera is not None:
+                self.rig.set_transform(camera, Calibration())
+            else:
+                self.calibration = Calibration()
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+            await websocket.send(json.dumps({"type": "calibration", "status": "reset"}))
@@ -0,0 +1,120 @@
+"""
+Thread lifecycle shared by the camera trackers (PoseTracker, HandTracker and
+their Tasks-API variants in landmarker_tracking.py).
+
+Subclasses set `name` (for logs) and `thread_name` (the profiler samples
+threads by name), implement _create_model() and _run_loop(generation), and
+open the camera with _open_capture() so restart() can release it.
+"""
+
+import time
+import threading
+import logging
+import numpy as np
+import cv2
+
+logger = logging.getLogger("CaptureTracker")
+
+
+class CaptureTracker:
+    name = "Tracker"
+    thread_name = "Tracker"
+    reuse_model = True  # False when _run_loop closes its model on exit (Tasks landmarkers)
+
+    def _init_capture_tracker(self, source):
+        self.source = source
+        self.running = False
+        self.cap = None  # Capture of the current thread, released on restart
+
+        # Liveness info for the Supervisor
+        self.last_heartbeat = time.time()  # Updated on every processed frame
+        self.generation = 0  # Bumped on restart so an abandoned thread exits
+        self.last_error = None
+        self.thread = None
+
+        # Held by the capture thread while it is inside the model; a restart
+        # that finds it taken knows the old thread hung in inference
+        self.model_lock = threading.Lock()
+        self.model = self._create_model()
+
+    def warm_up(self, frames=3, size=(480, 640)):
+        """
+        Runs a few blank frames through the model so graph setup and the
+        first (slow) inference happen before the show, not on the first person.
+        """
+        start = time.time()
+        blank = np.zeros((size[0], size[1], 3), dtype=np.uint8)
+        for _ in range(frames):
+            self.model.process(blank)
+        logger.info(f"{self.name} model warmed up in {time.time() - start:.2f}s")
+
+    def start(self):
+        self.running = True
+        self.last_heartbeat = time.time()
+        self.thread = threading.Thread(target=self._thread_main, args=(self.generation,), name=self.thread_name)
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"{self.name} started.")
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            # A thread stuck in cap.read() never returns; don't hang shutdown on it
+            self.thread.join(timeout=2.0)
+        logger.info(f"{self.name} stopped.")
+
+    def is_alive(self):
+        return self.running and self.thread is not None and self.thread.is_alive()
+
+    def restart(self):
+        """
+        Abandons the current capture thread (it exits on its own if it ever
+        wakes up), releases its camera and starts a fresh capture.
+
+        The model is kept when the old thread is outside it, so a camera stall
+        costs only reopening the camera. It is re-created and warmed up again
+        (a few seconds) only if the thread crashed or hung inside inference.
+        """
+        crashed = self.thread is not None and not self.thread.is_alive() and self.last_error is not None
+        idle = self.model_lock.acquire(blocking=False)
+        self.generation += 1
+        if idle:
+            self.model_lock.release()
+        if crashed or not idle or not self.reuse_model:
+            # The old thread keeps the old model and lock; the new thread gets its own
+            self.model_lock = threading.Lock()
+            self.model = self._create_model()
+            self.warm_up(frames=1)
+
+        cap, self.cap = self.cap, None
+        if cap is not None:
+            cap.release()  # Unblocks a read() on most backends and frees the device for the new capture
+        self.last_error = None
+        self.start()
+        logger.info(f"{self.name} restarted (generation {self.generation}, "
+                    f"{'new' if crashed or not idle or not self.reuse_model else 'same'} model).")
+
+    def _open_capture(self, generation):
+        """Opens the camera for this thread; returns None (and stops) if it can't."""
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            logger.error(f"Cannot open camera source {self.source}")
+            if generation == self.generation:
+                self.running = False
+            return None
+        if generation == self.generation:
+            self.cap = cap
+        return cap
+
+    def _thread_main(self, generation):
+        try:
+            self._run_loop(generation)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"{self.name} thread crashed: {e}")
+
+    def _create_model(self):
+        raise NotImplementedError
+
+    def _run_loop(self, generation):
+        raise NotImplementedError
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the remote image providers, for load-testing
+AIVisualGenerator offline.
+
+Serves just enough of each API for the SDK calls the generator makes:
+  OpenAI   POST /v1/images/generations          -> {"data": [{"url": ...}]} (or b64_json)
+           GET  /files/<n>.png                   -> the image behind that URL
+  Gemini   POST /v1beta/models/<m>:generateContent  -> a canned art prompt
+           POST /v1beta/models/<m>:predict          -> {"predictions": [{"bytesBase64Encoded": ...}]}
+  GET /stats                                     -> request/outcome counters
+
+Each endpoint draws its latency from a configurable distribution and fails
+with configurable probabilities (HTTP 500, 429 with Retry-After, or a hang
+that never answers, to exercise timeouts). Images are random noise, so PNG
+size follows --image-size. A fixed --seed makes runs reproducible.
+
+Point the generator at it:
+    python fake_ai_provider.py --port 8790 --imagen-latency lognormal:4,0.4 --error-rate 0.05
+    AI_PROVIDER=openai OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:8790/v1 python main.py
+    AI_PROVIDER=gemini GOOGLE_API_KEY=fake GEMINI_API_ENDPOINT=http://127.0.0.1:8790 python main.py
+
+Latency specs: fixed:S, uniform:A,B, exp:MEAN, lognormal:MEDIAN,SIGMA (seconds).
+"""
+
+import argparse
+import base64
+import json
+import logging
+import log_setup
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import cv2
+
+logger = logging.getLogger("FakeAIProvider")
+
+ART_PROMPT = ("A neon cyberpunk silhouette dissolving into streams of cyan and magenta light, "
+              "electric blue haze, dramatic rim lighting, high contrast, vivid saturation")
+
+
+def parse_latency(spec):
+    """Turns a latency spec ("lognormal:2,0.5") into a function rng -> seconds."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def noise_png(size, seed):
+    """Random-noise PNG; noise doesn't compress, so the payload is ~size*size*3 bytes."""
+    pixels = np.random.default_rng(seed).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    return cv2.imencode(".png", pixels)[1].tobytes()
+
+
+class FakeProvider:
+    def __init__(self, openai_latency="lognormal:8,0.3", vision_latency="lognormal:1.5,0.3",
+                 imagen_latency="lognormal:5,0.3", error_rate=0.0, rate_limit_rate=0.0, retry_after=10.0,
+                 hang_rate=0.0, image_size=1024, variants=4, seed=0):
+        self.latency = {
+            "openai": parse_latency(openai_latency),
+            "vision": parse_latency(vision_latency),
+            "imagen": parse_latency(imagen_latency),
+            "download": parse_latency("fixed:0"),
+        }
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.hang_rate = hang_rate
+        # A few distinct images, rendered up front so serving them costs nothing
+        self.images = [noise_png(image_size, seed + i) for i in range(variants)]
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.hang = threading.Event()  # Never set; hung requests wait on it until shutdown
+
+    def draw(self, endpoint):
+        """Decides a request's fate: (latency seconds, outcome, image index)."""
+        with self.lock:
+            latency = self.latency[endpoint](self.rng)
+            roll = self.rng.random()
+            image = self.rng.randrange(len(self.images))
+        if endpoint == "download":
+            outcome = "ok"  # Failures are injected on the generation call, not on fetching its result
+        elif roll < self.hang_rate:
+            outcome = "hang"
+        elif roll < self.hang_rate + self.rate_limit_rate:
+            outcome = "rate_limited"
+        elif roll < self.hang_rate + self.rate_limit_rate + self.error_rate:
+            outcome = "error"
+        else:
+            outcome = "ok"
+        return latency, outcome, image
+
+    def count(self, endpoint, outcome):
+        with self.lock:
+            counts = self.stats.setdefault(endpoint, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def provider(self):
+        return self.server.provider
+
+    def log_message(self, format, *args):
+        pass  # One line per request would drown the benchmark's own output
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/stats":
+            with self.provider.lock:
+                self._send_json(200, self.provider.stats)
+            return
+        match = re.fullmatch(r"/files/(\d+)\.png", path)
+        if not match or int(match.group(1)) >= len(self.provider.images):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        self._handle("download", lambda image: (200, "image/png", self.provider.images[int(match.group(1))]))
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            body = {}
+
+        if path.endswith("/images/generations"):
+            self._handle("openai", lambda image: self._openai_images(body, image))
+        elif path.endswith(":generateContent"):
+            self._handle("vision", lambda image: self._json(200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": ART_PROMPT}]},
+                                "finishReason": "STOP", "index": 0}],
+            }))
+        elif path.endswith(":predict"):
+            self._handle("imagen", lambda image: self._json(200, {
+                "predictions": [{"mimeType": "image/png",
+                                 "bytesBase64Encoded": base64.b64encode(self.provider.images[image]).decode()}],
+            }))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown endpoint {path}"}})
+
+    def _openai_images(self, body, image):
+        if body.get("response_format") == "b64_json":
+            item = {"b64_json": base64.b64encode(self.provider.images[image]).decode()}
+        else:
+            host = self.headers.get("Host", f"127.0.0.1:{self.server.server_port}")
+            item = {"url": f"http://{host}/files/{image}.png"}
+        item["revised_prompt"] = body.get("prompt", "")
+        return self._json(200, {"created": int(time.time()), "data": [item]})
+
+    def _handle(self, endpoint, respond):
+        latency, outcome, image = self.provider.draw(endpoint)
+        self.provider.count(endpoint, outcome)
+        if outcome == "hang":
+            self.provider.hang.wait()
+            return
+        time.sleep(latency)
+
+        if outcome == "rate_limited":
+            self._send_json(429, {"error": {"code": 429, "message": "Rate limit exceeded",
+                                            "status": "RESOURCE_EXHAUSTED"}},
+                            {"Retry-After": f"{self.provider.retry_after:g}"})
+        elif outcome == "error":
+            self._send_json(500, {"error": {"code": 500, "message": "Injected failure", "status": "INTERNAL"}})
+        else:
+            status, content_type, payload = respond(image)
+            self._send(status, content_type, payload)
+
+    @staticmethod
+    def _json(status, data):
+        return status, "application/json", json.dumps(data).encode()
+
+    def _send_json(self, status, data, headers=None):
+        self._send(*self._json(status, data), headers)
+
+    def _send(self, status, content_type, payload, headers=None):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up (timeout) before we answered
+
+
+def start_server(provider, host="127.0.0.1", port=8790):
+    """Serves `provider` on a background thread; returns the server (shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.provider = provider
+    thread = threading.Thread(target=server.serve_forever, name="FakeAIProvider", daemon=True)
+    thread.start()
+    logger.info(f"Fake AI provider on http://{host}:{server.server_port} "
+                f"({len(provider.images)} images of {len(provider.images[0]) / 1e3:.0f} kB)")
+    return server
+
+
+def add_provider_arguments(parser):
+    parser.add_argument("--openai-latency", default="lognormal:8,0.3", help="DALL-E generation latency")
+    parser.add_argument("--vision-latency", default="lognormal:1.5,0.3", help="Gemini art-prompt latency")
+    parser.add_argument("--imagen-latency", default="lognormal:5,0.3", help="Imagen generation latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=10.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of calls that never answer")
+    parser.add_argument("--image-size", type=int, default=1024, help="Generated image width/height")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def provider_from_args(args):
+    return FakeProvider(args.openai_latency, args.vision_latency, args.imagen_latency, args.error_rate,
+                        args.rate_limit_rate, args.retry_after, args.hang_rate, args.image_size, seed=args.seed)
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    parser = argparse.ArgumentParser(description="Fake OpenAI/Gemini image provider with latency and failure injection.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    add_provider_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_server(provider_from_args(args), args.host, args.port)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
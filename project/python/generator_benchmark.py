@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Throughput / tail-latency benchmark for AIVisualGenerator.
+
+Starts fake_ai_provider.py in this process, points the generator at it
+(AI_PROVIDER, OPENAI_BASE_URL / GEMINI_API_ENDPOINT) and submits requests
+as an open-loop Poisson arrival stream, the way triggers arrive during a
+show. Measures request -> texture_ready latency, how many requests were
+served by the provider vs the local fallback (circuit open, rate limited,
+failed), and the provider-side call counts, as JSON.
+
+Usage:
+    python generator_benchmark.py --provider gemini --requests 40 --rate 0.5 --with-image --scenes 5
+    python generator_benchmark.py --provider openai --requests 100 --rate 2 --error-rate 0.1 \\
+        --rate-limit-rate 0.05 --imagen-latency lognormal:3,0.6 --output gen.json
+
+The generator's own limits (AI_RATE_PER_MINUTE, AI_MAX_CONCURRENCY, AI_READ_TIMEOUT)
+apply as in production; override them with the matching options to compare settings.
+"""
+
+import argparse
+import json
+import logging
+import log_setup
+import os
+import platform
+import random
+import tempfile
+import time
+import numpy as np
+from fake_ai_provider import add_provider_arguments, provider_from_args, start_server
+from ws_benchmark import percentiles
+
+logger = logging.getLogger("GeneratorBenchmark")
+
+
+def configure_environment(args, port):
+    """Points the generator at the fake provider (must run before AIVisualGenerator is created)."""
+    os.environ["AI_PROVIDER"] = args.provider
+    if args.provider == "openai":
+        os.environ["OPENAI_API_KEY"] = "fake"
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    else:
+        os.environ["GOOGLE_API_KEY"] = "fake"
+        os.environ["GEMINI_API_ENDPOINT"] = f"http://127.0.0.1:{port}"
+    for name, value in (("AI_RATE_PER_MINUTE", args.rate_per_minute), ("AI_MAX_CONCURRENCY", args.max_concurrency),
+                        ("AI_READ_TIMEOUT", args.read_timeout)):
+        if value is not None:
+            os.environ[name] = str(value)
+
+
+def run_benchmark(args):
+    provider = provider_from_args(args)
+    server = start_server(provider, port=args.port)
+    configure_environment(args, server.server_port)
+    from ai_visual_generation import AIVisualGenerator
+
+    # Distinct scenes to pick from per request (repeats exercise the art-prompt cache)
+    scenes = [None]
+    if args.with_image:
+        from PIL import Image
+        scene_rng = np.random.default_rng(args.seed)
+        scenes = [Image.fromarray(scene_rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)).resize((512, 512))
+                  for _ in range(args.scenes)]
+
+    output_dir = tempfile.mkdtemp(prefix="generator-benchmark-")
+    generator = AIVisualGenerator(output_dir=output_dir)
+    generator.start()
+
+    rng = random.Random(args.seed)
+    submitted = {}  # prefix -> submit time
+    latencies, provider_latencies = [], []
+    served = {"provider": 0, "fallback": 0}
+    start = time.monotonic()
+    next_arrival = start
+
+    def collect():
+        for event in generator.get_results():
+            submit_time = submitted.get(event["prefix"])
+            if submit_time is None:
+                continue
+            latency = time.monotonic() - submit_time
+            latencies.append(latency)
+            # The generator tags each texture with where it came from
+            if event["source"] == "provider":
+                served["provider"] += 1
+                provider_latencies.append(latency)
+            else:
+                served["fallback"] += 1
+
+    # Open loop: arrivals don't wait for earlier requests to finish
+    while len(submitted) < args.requests:
+        now = time.monotonic()
+        if now >= next_arrival:
+            prefix = f"bench{len(submitted)}"
+            submitted[prefix] = now
+            generator.request_generation("neon cyberpunk texture", prefix, source_image=rng.choice(scenes))
+            next_arrival += rng.expovariate(args.rate)
+        collect()
+        time.sleep(0.005)
+    submit_elapsed = time.monotonic() - start
+
+    drain_deadline = time.monotonic() + args.drain
+    while len(latencies) < args.requests and time.monotonic() < drain_deadline:
+        collect()
+        time.sleep(0.01)
+    elapsed = time.monotonic() - start
+    guard_status = generator.provider_status()
+    generator.stop()
+    server.shutdown()
+
+    with provider.lock:
+        provider_calls = json.loads(json.dumps(provider.stats))
+    return {
+        "config": vars(args),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "timestamp": time.time(),
+        "requests": {
+            "submitted": args.requests,
+            "offered_rate": args.requests / submit_elapsed,
+            "completed": len(latencies),
+            "missing": args.requests - len(latencies),
+            "served_by_provider": served["provider"],
+            "served_by_fallback": served["fallback"],
+        },
+        "throughput": {
+            "completed_per_s": len(latencies) / elapsed,
+            "provider_per_s": served["provider"] / elapsed,
+        },
+        # Trigger -> texture_ready, including queueing behind the guard's limits
+        "latency_ms": percentiles(np.array(latencies)),
+        "provider_latency_ms": percentiles(np.array(provider_latencies)),
+        "generator": guard_status,
+        "provider_calls": provider_calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AIVisualGenerator against a fake provider.")
+    parser.add_argument("--provider", choices=("gemini", "openai"), default="gemini")
+    parser.add_argument("--requests", type=int, default=30, help="Generation requests to submit")
+    parser.add_argument("--rate", type=float, default=0.5, help="Mean request arrivals per second (Poisson)")
+    parser.add_argument("--with-image", action="store_true", help="Send a source image (Gemini vision + Imagen)")
+    parser.add_argument("--scenes", type=int, default=5, help="Distinct source images to draw from")
+    parser.add_argument("--drain", type=float, default=120.0, help="Max seconds to wait for outstanding requests")
+    parser.add_argument("--rate-per-minute", type=float, help="Override AI_RATE_PER_MINUTE")
+    parser.add_argument("--max-concurrency", type=int, help="Override AI_MAX_CONCURRENCY")
+    parser.add_argument("--read-timeout", type=float, help="Override AI_READ_TIMEOUT")
+    parser.add_argument("--port", type=int, default=0, help="Fake provider port (0 = any free port)")
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    add_provider_arguments(parser)
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        logger.info(f"Report written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    main()
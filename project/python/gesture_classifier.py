@@ -0,0 +1,147 @@
+import os
+import logging
+import numpy as np
+
+logger = logging.getLogger("GestureClassifier")
+
+# MediaPipe hand landmark indices
+WRIST = 0
+MIDDLE_MCP = 9
+FINGER_TIPS = (8, 12, 16, 20)   # index, middle, ring, pinky
+FINGER_MCPS = (5, 9, 13, 17)
+
+# Classes of the built-in finger-extension rule (used until templates are enrolled)
+RULE_CLASSES = ("fist", "pointing", "bunny", "open_palm", "partial")
+
+
+def normalize_hands(batch, handedness=None):
+    """
+    Normalizes a (H, 21, 2+) batch of hand landmarks into (H, 42) feature
+    vectors that don't depend on where the hand is, how big it is, or how
+    it is rotated: wrist at the origin, wrist->middle MCP pointing up with
+    length 1. Left hands are mirrored so one template set covers both.
+    """
+    points = np.asarray(batch, dtype=np.float32)[:, :, :2]
+    points = points - points[:, WRIST:WRIST + 1]
+
+    axis = points[:, MIDDLE_MCP]
+    length = np.linalg.norm(axis, axis=1)
+    length[length < 1e-6] = 1e-6
+    # Rotate each hand so its axis maps to (0, -1), i.e. "up" in image coordinates
+    cos = -axis[:, 1] / length
+    sin = -axis[:, 0] / length
+    rotation = np.stack([np.stack([cos, -sin], axis=1), np.stack([sin, cos], axis=1)], axis=1)
+    points = np.einsum("hij,hkj->hki", rotation, points) / length[:, None, None]
+
+    if handedness is not None:
+        mirror = np.array([label == "Left" for label in handedness])
+        points[mirror, :, 0] *= -1
+
+    return points.reshape(len(points), -1)
+
+
+class GestureClassifier:
+    """
+    Classifies every detected hand in one vectorized call.
+
+    With enrolled templates (see gesture_enroll.py) it is a nearest-centroid
+    classifier over normalized landmarks, returning softmax confidences per
+    class. Without templates it falls back to a vectorized version of the
+    original finger-extension rule.
+    """
+
+    def __init__(self, template_path="gesture_templates.npz", temperature=0.05):
+        self.temperature = temperature
+        self.centroids = None
+        self.classes = RULE_CLASSES
+
+        if template_path and os.path.exists(template_path):
+            templates = np.load(template_path)
+            samples = templates["samples"]
+            sample_labels = templates["labels"]
+            self.classes = tuple(str(c) for c in np.unique(sample_labels))
+            self.centroids = np.stack([samples[sample_labels == c].mean(axis=0) for c in self.classes])
+            logger.info(f"Loaded gesture templates for {self.classes} from {template_path}")
+        else:
+            logger.info("No gesture templates found; using finger-extension rule")
+
+    def classify(self, batch, handedness=None):
+        """
+        batch: (H, 21, 2+) landmarks of all hands in the frame.
+        Returns an (H, len(self.classes)) array of per-class confidences.
+        """
+        batch = np.asarray(batch, dtype=np.float32)
+        if len(batch) == 0:
+            return np.zeros((0, len(self.classes)), dtype=np.float32)
+        if self.centroids is None:
+            return self._classify_rule(batch)
+
+        features = normalize_hands(batch, handedness)
+        distances = ((features[:, None, :] - self.centroids[None, :, :]) ** 2).mean(axis=2)
+        logits = -distances / self.temperature
+        logits -= logits.max(axis=1, keepdims=True)
+        scores = np.exp(logits)
+        return scores / scores.sum(axis=1, keepdims=True)
+
+    def _classify_rule(self, batch):
+        points = batch[:, :, :2]
+        wrist = points[:, WRIST:WRIST + 1]
+        # A finger is extended if its tip is further from the wrist than its MCP
+        tip_dist = np.linalg.norm(points[:, FINGER_TIPS] - wrist, axis=2)
+        mcp_dist = np.linalg.norm(points[:, FINGER_MCPS] - wrist, axis=2)
+        extended = tip_dist > mcp_dist * 1.2  # (H, 4)
+        count = extended.sum(axis=1)
+
+        labels = np.full(len(batch), RULE_CLASSES.index("partial"))
+        labels[count >= 3] = RULE_CLASSES.index("open_palm")
+        labels[(count == 1) & extended[:, 0]] = RULE_CLASSES.index("pointing")
+        labels[(count == 2) & extended[:, 0] & extended[:, 1]] = RULE_CLASSES.index("bunny")
+        labels[count == 0] = RULE_CLASSES.index("fist")
+
+        scores = np.zeros((len(batch), len(RULE_CLASSES)), dtype=np.float32)
+        scores[np.arange(len(batch)), labels] = 1.0
+        return scores
+
+
+class GestureDebouncer:
+    """
+    Temporal smoothing per tracked hand: class scores are averaged over time
+    and the reported gesture only changes after the new class has been on
+    top for `hold_frames` consecutive frames. Hands are keyed by (person,
+    hand label), so two people's left hands don't reset each other.
+    """
+
+    def __init__(self, classes, alpha=0.5, hold_frames=3):
+        self.classes = classes
+        self.alpha = alpha
+        self.hold_frames = hold_frames
+        self.state = {}  # key -> [smoothed scores, current label, candidate label, candidate count]
+
+    def update(self, key, scores):
+        """Returns (gesture, confidence) for one hand given its latest scores."""
+        state = self.state.get(key)
+        if state is None:
+            best = int(np.argmax(scores))
+            state = self.state[key] = [np.array(scores, dtype=np.float32), best, best, 0]
+        else:
+            state[0] = self.alpha * np.asarray(scores) + (1 - self.alpha) * state[0]
+
+        smoothed = state[0]
+        best = int(np.argmax(smoothed))
+        if best == state[1]:
+            state[3] = 0
+        elif best == state[2]:
+            state[3] += 1
+            if state[3] >= self.hold_frames:
+                state[1], state[3] = best, 0
+        else:
+            state[2], state[3] = best, 1
+
+        current = state[1]
+        return self.classes[current], float(smoothed[current])
+
+    def prune(self, active_keys):
+        """Forgets hands that are no longer in frame."""
+        for key in list(self.state):
+            if key not in active_keys:
+                del self.state[key]
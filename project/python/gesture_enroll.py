@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Gesture enrollment tool.
+Records hand-shape templates for GestureClassifier. Run it before the show
+(it opens the camera itself, so not while main.py is running).
+
+Usage:
+    python gesture_enroll.py fist pointing open_palm bunny heart
+Keys:
+    1-9    select the gesture to record
+    SPACE  start/stop recording samples for the selected gesture
+    s      save templates and quit
+    q      quit without saving
+"""
+
+import os
+import sys
+import cv2
+import logging
+import log_setup
+import mediapipe as mp
+import numpy as np
+from gesture_classifier import normalize_hands
+
+logger = logging.getLogger("GestureEnroll")
+
+TEMPLATE_PATH = "gesture_templates.npz"
+WINDOW_NAME = 'Gesture Enrollment'
+
+def main():
+    gestures = sys.argv[1:] or ["fist", "pointing", "bunny", "open_palm"]
+
+    samples, labels = [], []
+    if os.path.exists(TEMPLATE_PATH):
+        existing = np.load(TEMPLATE_PATH)
+        samples, labels = list(existing["samples"]), list(existing["labels"])
+        logger.info(f"Loaded {len(samples)} existing samples from {TEMPLATE_PATH}")
+
+    mp_hands = mp.solutions.hands
+    mp_drawing = mp.solutions.drawing_utils
+    hands = mp_hands.Hands(
+        static_image_mode=False,
+        max_num_hands=2,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+    cap = cv2.VideoCapture(0)
+    if not cap.isOpened():
+        logger.error("Cannot open camera")
+        return
+
+    selected = 0
+    recording = False
+    save = False
+
+    try:
+        while True:
+            success, image = cap.read()
+            if not success:
+                continue
+
+            image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
+            results = hands.process(image)
+            image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+            if results.multi_hand_landmarks and results.multi_handedness:
+                batch = np.array([[(l.x, l.y) for l in hand.landmark] for hand in results.multi_hand_landmarks],
+                                 dtype=np.float32)
+                hand_labels = [h.classification[0].label for h in results.multi_handedness]
+                for hand_landmarks in results.multi_hand_landmarks:
+                    mp_drawing.draw_landmarks(image_bgr, hand_landmarks, mp_hands.HAND_CONNECTIONS)
+                if recording:
+                    for features in normalize_hands(batch, hand_labels):
+                        samples.append(features)
+                        labels.append(gestures[selected])
+
+            counts = {g: labels.count(g) for g in gestures}
+            y_offset = 30
+            for i, gesture in enumerate(gestures):
+                marker = ">" if i == selected else " "
+                color = (0, 0, 255) if (i == selected and recording) else (255, 255, 255)
+                cv2.putText(image_bgr, f"{marker} {i + 1}: {gesture} ({counts[gesture]})", (10, y_offset),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+                y_offset += 30
+            cv2.putText(image_bgr, "REC" if recording else "SPACE: record  s: save  q: quit",
+                        (10, image_bgr.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
+
+            cv2.imshow(WINDOW_NAME, image_bgr)
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                break
+            elif key == ord('s'):
+                save = True
+                break
+            elif key == ord(' '):
+                recording = not recording
+            elif ord('1') <= key <= ord('9') and key - ord('1') < len(gestures):
+                selected = key - ord('1')
+                recording = False
+
+    except KeyboardInterrupt:
+        logger.info("Interrupted by user")
+    finally:
+        cap.release()
+        cv2.destroyAllWindows()
+
+    if save and samples:
+        np.savez(TEMPLATE_PATH, samples=np.array(samples, dtype=np.float32), labels=np.array(labels))
+        logger.info(f"Saved {len(samples)} samples to {TEMPLATE_PATH}")
+
+if __name__ == "__main__":
+    log_setup.configure()
+    main()
@@ -1,5 +1,6 @@
 import cv2
 import time
+import log_setup
 from hand_tracking import HandTracker
 
 def main():
@@ -35,4 +36,5 @@ def main():
         print("\nHand gesture viewer stopped")
 
 if __name__ == "__main__":
+    log_setup.configure()
     main()
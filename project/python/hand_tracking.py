@@ -1,91 +1,65 @@
 import cv2
 import mediapipe as mp
+import numpy as np
 import time
 import threading
 import logging
-import math
+import log_setup
+from gesture_classifier import GestureClassifier, GestureDebouncer
+from capture_tracker import CaptureTracker
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("HandTracking")
 
-class HandTracker:
-    def __init__(self, source=0, show_window=False):
-        self.source = source
+def assign_people(batch, hand_labels, people):
+    """
+    Person index (as in the pose's people list, 0 = primary) of each hand:
+    the person with the nearest wrist. Without poses, same-side hands are
+    numbered left to right.
+    """
+    if people:
+        wrists = np.array([[person["left_wrist"], person["right_wrist"]] for person in people], dtype=np.float32)
+        distances = np.linalg.norm(wrists[None] - batch[:, None, None, 0], axis=-1).min(axis=2)  # (H, P)
+        return [int(i) for i in distances.argmin(axis=1)]
+    order = np.argsort(batch[:, 0, 0]) if len(batch) else []
+    persons, seen = [0] * len(hand_labels), {}
+    for i in order:
+        persons[i] = seen.get(hand_labels[i], 0)
+        seen[hand_labels[i]] = persons[i] + 1
+    return persons
+
+class HandTracker(CaptureTracker):
+    name = "Hand tracking"
+    thread_name = "HandTracker"
+
+    def __init__(self, source=0, show_window=False, gesture_templates="gesture_templates.npz"):
         self.show_window = show_window
+        self.classifier = GestureClassifier(gesture_templates)
+        self.debouncer = GestureDebouncer(self.classifier.classes)
+        self.pose_source = None  # Pose tracker on the same camera; its people give each hand a person index
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
+        self.latest_hands = None
+        self.lock = threading.Lock()
+        self.window_created = False
+
+        # Debug preview (see PreviewStream): only filled while someone is watching
+        self.preview_enabled = False
+        self.preview_hands = []  # [((21, 2) landmark array, hand label, gesture), ...]
+
+        self._init_capture_tracker(source)
+
+    def _create_model(self):
+        return self.mp_hands.Hands(
             static_image_mode=False,
             max_num_hands=2,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        self.running = False
-        self.latest_hands = None
-        self.lock = threading.Lock()
-        self.window_created = False
 
-    def start(self):
-        self.running = True
-        self.thread = threading.Thread(target=self._run_loop)
-        self.thread.daemon = True
-        self.thread.start()
-        logger.info("Hand tracking started.")
-
-    def stop(self):
-        self.running = False
-        if self.thread.is_alive():
-            self.thread.join()
-        logger.info("Hand tracking stopped.")
-
-    def _detect_gesture(self, hand_landmarks):
-        """Detect hand gesture based on finger positions"""
-        landmarks = hand_landmarks.landmark
-        
-        # Get key points
-        wrist = landmarks[self.mp_hands.HandLandmark.WRIST]
-        thumb_tip = landmarks[self.mp_hands.HandLandmark.THUMB_TIP]
-        index_tip = landmarks[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-        middle_tip = landmarks[self.mp_hands.HandLandmark.MIDDLE_FINGER_TIP]
-        ring_tip = landmarks[self.mp_hands.HandLandmark.RING_FINGER_TIP]
-        pinky_tip = landmarks[self.mp_hands.HandLandmark.PINKY_TIP]
-        
-        index_mcp = landmarks[self.mp_hands.HandLandmark.INDEX_FINGER_MCP]
-        middle_mcp = landmarks[self.mp_hands.HandLandmark.MIDDLE_FINGER_MCP]
-        ring_mcp = landmarks[self.mp_hands.HandLandmark.RING_FINGER_MCP]
-        pinky_mcp = landmarks[self.mp_hands.HandLandmark.PINKY_MCP]
-        
-        # Calculate if fingers are extended
-        def is_extended(tip, mcp, wrist):
-            # Finger is extended if tip is further from wrist than mcp
-            tip_dist = math.sqrt((tip.x - wrist.x)**2 + (tip.y - wrist.y)**2)
-            mcp_dist = math.sqrt((mcp.x - wrist.x)**2 + (mcp.y - wrist.y)**2)
-            return tip_dist > mcp_dist * 1.2
-        
-        index_extended = is_extended(index_tip, index_mcp, wrist)
-        middle_extended = is_extended(middle_tip, middle_mcp, wrist)
-        ring_extended = is_extended(ring_tip, ring_mcp, wrist)
-        pinky_extended = is_extended(pinky_tip, pinky_mcp, wrist)
-        
-        # Count extended fingers
-        extended_count = sum([index_extended, middle_extended, ring_extended, pinky_extended])
-        
-        # Detect gestures
-        if extended_count == 0:
-            return "fist"
-        elif extended_count == 2 and index_extended and middle_extended:
-            return "bunny"  # Bunny ears - index and middle extended
-        elif extended_count == 1 and index_extended:
-            return "pointing"
-        elif extended_count >= 3:
-            return "open_palm"
-        else:
-            return "partial"
-
-    def _run_loop(self):
-        cap = cv2.VideoCapture(self.source)
-        if not cap.isOpened():
-            logger.error(f"Cannot open camera source {self.source}")
-            self.running = False
+    def _run_loop(self, generation):
+        # Keep references: restart() may swap in a new model (and lock) for the next thread
+        hands, model_lock = self.model, self.model_lock
+        cap = self._open_capture(generation)
+        if cap is None:
             return
 
         if self.show_window:
@@ -101,79 +75,68 @@ class HandTracker:
                 logger.warning(f"Could not create window: {e}")
                 self.show_window = False
 
-        while self.running:
+        while self.running and generation == self.generation:
             success, image = cap.read()
             if not success:
                 logger.warning("Ignoring empty camera frame.")
                 continue
+            capture_time = time.monotonic()
 
             image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
             image.flags.writeable = False
-            results = self.hands.process(image)
+            with model_lock:
+                if generation != self.generation:
+                    break  # Replaced while waiting for the camera; the model may be the new thread's now
+                results = hands.process(image)
+            self.last_heartbeat = time.time()
 
             image.flags.writeable = True
             image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
 
             hands_data = []
-            
             if results.multi_hand_landmarks and results.multi_handedness:
-                for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
+                batch = np.array([[(l.x, l.y) for l in hand.landmark] for hand in results.multi_hand_landmarks],
+                                 dtype=np.float32)
+                # Get hand labels (Left or Right)
+                hand_labels = [handedness.classification[0].label for handedness in results.multi_handedness]
+                hand_scores = [handedness.classification[0].score for handedness in results.multi_handedness]
+                hands_data = self._publish_hands(batch, hand_labels, hand_scores, capture_time)
+            else:
+                self._publish_hands(np.zeros((0, 21, 2), dtype=np.float32), [], [], capture_time)
+
+            if self.show_window and self.window_created:
+                for hand_landmarks, hand_data in zip(results.multi_hand_landmarks or [], hands_data):
                     # Draw hand landmarks
-                    if self.show_window and self.window_created:
-                        mp_drawing.draw_landmarks(
-                            image_bgr,
-                            hand_landmarks,
-                            self.mp_hands.HAND_CONNECTIONS,
-                            mp_drawing_styles.get_default_hand_landmarks_style(),
-                            mp_drawing_styles.get_default_hand_connections_style()
-                        )
-                    
-                    # Detect gesture
-                    gesture = self._detect_gesture(hand_landmarks)
-                    
-                    # Get hand label (Left or Right)
-                    hand_label = handedness.classification[0].label
-                    
-                    # Get index finger tip position
-                    index_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-                    
-                    hands_data.append({
-                        "hand": hand_label,
-                        "gesture": gesture,
-                        "index_tip": [index_tip.x, index_tip.y],
-                        "confidence": handedness.classification[0].score
-                    })
-                    
-                    # Draw gesture text on image
-                    if self.show_window and self.window_created:
-                        # Get wrist position for text placement
-                        wrist = hand_landmarks.landmark[self.mp_hands.HandLandmark.WRIST]
-                        h, w, _ = image_bgr.shape
-                        text_x = int(wrist.x * w)
-                        text_y = int(wrist.y * h) - 20
-                        
-                        # Color based on gesture
-                        if gesture == 'fist':
-                            color = (0, 0, 255)  # Red
-                        elif gesture == 'pointing':
-                            color = (0, 255, 255)  # Yellow
-                        elif gesture == 'open_palm':
-                            color = (0, 255, 0)  # Green
-                        elif gesture == 'bunny':
-                            color = (255, 0, 255)  # Pink/Magenta
-                        else:
-                            color = (255, 255, 255)  # White
-                        
-                        # Draw text
-                        text = f"{hand_label}: {gesture.upper()}"
-                        cv2.putText(image_bgr, text, (text_x, text_y),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2, cv2.LINE_AA)
-
-            with self.lock:
-                self.latest_hands = {
-                    "timestamp": time.time(),
-                    "hands": hands_data
-                }
+                    mp_drawing.draw_landmarks(
+                        image_bgr,
+                        hand_landmarks,
+                        self.mp_hands.HAND_CONNECTIONS,
+                        mp_drawing_styles.get_default_hand_landmarks_style(),
+                        mp_drawing_styles.get_default_hand_connections_style()
+                    )
+
+                    # Draw gesture text on image, above the wrist
+                    wrist = hand_landmarks.landmark[self.mp_hands.HandLandmark.WRIST]
+                    h, w, _ = image_bgr.shape
+                    text_x = int(wrist.x * w)
+                    text_y = int(wrist.y * h) - 20
+
+                    # Color based on gesture
+                    gesture = hand_data["gesture"]
+                    if gesture == 'fist':
+                        color = (0, 0, 255)  # Red
+                    elif gesture == 'pointing':
+                        color = (0, 255, 255)  # Yellow
+                    elif gesture == 'open_palm':
+                        color = (0, 255, 0)  # Green
+                    elif gesture == 'bunny':
+                        color = (255, 0, 255)  # Pink/Magenta
+                    else:
+                        color = (255, 255, 255)  # White
+
+                    text = f"{hand_data['hand']}: {gesture.upper()}"
+                    cv2.putText(image_bgr, text, (text_x, text_y),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2, cv2.LINE_AA)
 
             if self.show_window and self.window_created:
                 try:
@@ -193,6 +156,55 @@ class HandTracker:
             except:
                 pass
 
+    def _publish_hands(self, batch, hand_labels, hand_scores, capture_time):
+        """
+        Classifies and publishes the hands of one frame. Shared by the legacy
+        loop and the Tasks backend (landmarker_tracking.py).
+        batch: (H, 21, 2) normalized image coordinates, one row per hand.
+        Returns the published hands list.
+        """
+        # Classify all hands of this frame in one vectorized call
+        scores = self.classifier.classify(batch, hand_labels)
+        pose = self.pose_source.get_pose_data() if self.pose_source else None
+        persons = assign_people(batch, hand_labels, pose.get("people", [pose]) if pose else [])
+        keys = list(zip(persons, hand_labels))
+
+        hands_data = []
+        preview_hands = []
+        for i, hand_label in enumerate(hand_labels):
+            # Debounced gesture for this hand (two people's left hands don't share state)
+            gesture, gesture_confidence = self.debouncer.update(keys[i], scores[i])
+
+            # Get index finger tip position
+            index_tip = batch[i, self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
+
+            hands_data.append({
+                "hand": hand_label,
+                "gesture": gesture,
+                "gesture_confidence": gesture_confidence,
+                "index_tip": [float(index_tip[0]), float(index_tip[1])],
+                "confidence": float(hand_scores[i])
+            })
+
+            if self.preview_enabled:
+                preview_hands.append((batch[i], hand_label, gesture))
+
+        self.debouncer.prune(keys)
+
+        with self.lock:
+            self.latest_hands = {
+                "timestamp": time.time(),
+                "capture_time": capture_time,
+                "hands": hands_data
+            }
+            self.preview_hands = preview_hands
+        return hands_data
+
+    def get_preview_hands(self):
+        """Returns the hand landmarks for the debug preview (empty unless preview is enabled)."""
+        with self.lock:
+            return self.preview_hands
+
     def get_hands_data(self):
         """Returns the latest hand tracking data with gestures"""
         with self.lock:
@@ -200,6 +212,7 @@ class HandTracker:
 
 
 if __name__ == "__main__":
+    log_setup.configure()
     tracker = HandTracker(show_window=True)
     tracker.start()
     try:
@@ -0,0 +1,279 @@
+import os
+import glob
+import json
+import queue
+import threading
+import logging
+import log_setup
+import time
+import numpy as np
+
+logger = logging.getLogger("LandmarkHistory")
+
+# Fixed record layout. Segment files are raw arrays of RECORD_DTYPE with no
+# header, so they can be memory-mapped directly and appended to safely.
+KEYPOINTS = ("nose", "left_wrist", "right_wrist", "left_index", "right_index", "left_shoulder", "right_shoulder")
+HANDS = ("Left", "Right")
+# Initial gesture class table. Enrolled classes are appended as they are seen;
+# each segment has a CLASSES_EXT sidecar with the table its indices refer to.
+GESTURES = ("none", "fist", "pointing", "bunny", "open_palm", "partial")
+
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),                                    # time.time() of the pose
+    ("person", "<u2"),
+    ("gesture", "u1", (len(HANDS),)),                # Class table index per hand
+    ("landmarks", "<f4", (len(KEYPOINTS), 2)),       # normalized x, y per keypoint
+    ("hand_tips", "<f4", (len(HANDS), 2)),           # index fingertip per hand (NaN if unseen)
+])
+
+SEGMENT_EXT = ".lmk"
+CLASSES_EXT = ".classes.json"
+
+
+class LandmarkHistoryWriter:
+    """
+    Append-only landmark log. append() never blocks the caller: records go
+    through a bounded queue (dropped and counted if the writer falls behind)
+    and a background thread writes them in batches to segment files that
+    rotate every `segment_seconds`. Segments are named after the time of
+    their first record, which serves as the coarse time index for readers.
+    """
+
+    def __init__(self, directory="history", segment_seconds=3600, flush_interval=1.0, max_pending=10000):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.running = False
+        self.thread = None
+        self.segment_start = None
+        self.segment_file = None
+        self.segment_path = None
+        self.gestures = list(GESTURES)  # Only touched by the writer thread
+        os.makedirs(self.directory, exist_ok=True)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run_loop, name="LandmarkHistory")
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"Landmark history writing to {self.directory}")
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        logger.info(f"Landmark history stopped ({self.dropped} records dropped).")
+
+    def append(self, pose_data, hands_data=None, person=0):
+        """Queues one pose (and the hands seen with it) for writing. Never blocks."""
+        gestures = ["none"] * len(HANDS)  # Names; the writer thread maps them to class indices
+        tips = [[np.nan, np.nan] for _ in HANDS]
+        if hands_data:
+            for hand in hands_data.get("hands", []):
+                if hand["hand"] in HANDS:
+                    i = HANDS.index(hand["hand"])
+                    gestures[i] = hand["gesture"]
+                    tips[i] = hand["index_tip"]
+
+        record = (pose_data["timestamp"], person, gestures, [pose_data[k] for k in KEYPOINTS], tips)
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run_loop(self):
+        while self.running:
+            time.sleep(self.flush_interval)
+            try:
+                self._flush()
+            except Exception as e:
+                logger.error(f"Error writing landmark history: {e}")
+        self._flush()
+        if self.segment_file:
+            self.segment_file.close()
+
+    def _flush(self):
+        records = []
+        while True:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if not records:
+            return
+
+        known = len(self.gestures)
+        records = [(t, person, [self._gesture_index(name) for name in gestures], landmarks, tips)
+                   for t, person, gestures, landmarks, tips in records]
+        batch = np.array(records, dtype=RECORD_DTYPE)
+        if self.segment_file is None or batch["t"][0] - self.segment_start >= self.segment_seconds:
+            self._rotate(batch["t"][0])
+        elif len(self.gestures) > known:
+            self._write_classes()
+        self.segment_file.write(batch.tobytes())
+        self.segment_file.flush()
+
+    def _rotate(self, start_time):
+        if self.segment_file:
+            self.segment_file.close()
+        self.segment_start = start_time
+        path = os.path.join(self.directory, f"{int(start_time * 1000)}{SEGMENT_EXT}")
+        self.segment_path = path
+        self._write_classes()
+        self.segment_file = open(path, "ab")
+        logger.info(f"Started landmark history segment {path}")
+
+    def _gesture_index(self, name):
+        """Class table index of a gesture name, adding new (enrolled) classes to the table."""
+        if name not in self.gestures:
+            if len(self.gestures) > np.iinfo(np.uint8).max:
+                return 0
+            self.gestures.append(name)
+            logger.info(f"New gesture class in history: {name}")
+        return self.gestures.index(name)
+
+    def _write_classes(self):
+        # The table only grows, so rewriting it keeps earlier records of the segment valid
+        with open(self.segment_path + CLASSES_EXT, "w") as f:
+            json.dump({"gesture": self.gestures}, f)
+
+
+class LandmarkHistory:
+    """
+    Read side of the landmark log. Segments are memory-mapped and only the
+    slice inside the requested time range is touched (found by binary search
+    on the timestamp column), so queries never load whole files.
+    """
+
+    def __init__(self, directory="history"):
+        self.directory = directory
+
+    def segments(self):
+        """Returns [(start_time, path)] sorted by time."""
+        paths = glob.glob(os.path.join(self.directory, f"*{SEGMENT_EXT}"))
+        segments = []
+        for path in paths:
+            try:
+                segments.append((int(os.path.basename(path)[:-len(SEGMENT_EXT)]) / 1000.0, path))
+            except ValueError:
+                continue
+        return sorted(segments)
+
+    @staticmethod
+    def gesture_classes(path):
+        """Gesture class names indexed by a segment's `gesture` column."""
+        try:
+            with open(path + CLASSES_EXT) as f:
+                return json.load(f)["gesture"]
+        except (OSError, ValueError, KeyError):
+            return list(GESTURES)  # Segments written before class tables
+
+    def query(self, start=None, end=None, person=None):
+        """
+        Yields record arrays with start <= t < end, one per segment: memory-mapped
+        slices, or copies of one person's records if `person` (0 = primary) is given.
+        """
+        for _, records in self.query_segments(start, end, person):
+            yield records
+
+    def query_segments(self, start=None, end=None, person=None):
+        """Like query(), but yields (segment path, records) so gesture indices can be decoded."""
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        segments = self.segments()
+        for i, (segment_start, path) in enumerate(segments):
+            segment_end = segments[i + 1][0] if i + 1 < len(segments) else np.inf
+            if segment_end <= start or segment_start >= end:
+                continue
+
+            # Only whole records; the writer may be mid-append on the last segment
+            count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+            if count == 0:
+                continue
+            records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+            t = records["t"]
+            lo, hi = np.searchsorted(t, [start, end])
+            if hi <= lo:
+                continue
+            records = records[lo:hi]
+            if person is not None:
+                records = records[records["person"] == person]
+                if len(records) == 0:
+                    continue
+            yield path, records
+
+    def positions(self, keypoint, start=None, end=None, person=None):
+        """
+        Returns an (N, 2) array of one keypoint's positions, e.g. all right_index
+        points 14:00-15:00, of everyone or of one person.
+        """
+        k = KEYPOINTS.index(keypoint)
+        chunks = [records["landmarks"][:, k] for records in self.query(start, end, person)]
+        if not chunks:
+            return np.empty((0, 2), dtype=np.float32)
+        return np.concatenate(chunks)
+
+    def gesture_counts(self, hand, start=None, end=None, person=0):
+        """
+        Returns {gesture name: records} for one hand ("Left" / "Right"), e.g. how
+        often "heart" was shown. Hands are only logged with the primary person,
+        so other people are left out unless asked for.
+        """
+        h = HANDS.index(hand)
+        counts = {}
+        for path, records in self.query_segments(start, end, person):
+            classes = self.gesture_classes(path)
+            indices, n = np.unique(records["gesture"][:, h], return_counts=True)
+            for index, count in zip(indices, n):
+                name = classes[index] if index < len(classes) else "unknown"
+                counts[name] = counts.get(name, 0) + int(count)
+        return counts
+
+    def histogram2d(self, keypoint, start=None, end=None, bins=64, person=None):
+        """Returns a (bins, bins) count histogram of a keypoint over the normalized frame (x, y)."""
+        k = KEYPOINTS.index(keypoint)
+        hist = np.zeros((bins, bins), dtype=np.int64)
+        for records in self.query(start, end, person):
+            points = records["landmarks"][:, k]
+            h, _, _ = np.histogram2d(points[:, 0], points[:, 1], bins=bins, range=((0, 1), (0, 1)))
+            hist += h.astype(np.int64)
+        return hist
+
+    def dwell_seconds(self, keypoint, region, start=None, end=None, max_gap=0.5, person=None):
+        """
+        Seconds a keypoint spent inside region (x0, y0, x1, y1), for one person
+        or summed over everyone (each person timed on their own records). Gaps
+        longer than max_gap (not tracked) are not counted.
+        """
+        k = KEYPOINTS.index(keypoint)
+        x0, y0, x1, y1 = region
+        total = 0.0
+        for records in self.query(start, end, person):
+            for p in np.unique(records["person"]):
+                own = records[records["person"] == p]
+                points = own["landmarks"][:, k]
+                dt = np.diff(own["t"], append=own["t"][-1])
+                dt[dt > max_gap] = 0.0
+                inside = (points[:, 0] >= x0) & (points[:, 0] < x1) & (points[:, 1] >= y0) & (points[:, 1] < y1)
+                total += float(dt[inside].sum())
+        return total
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    # Summary of the last hour
+    history = LandmarkHistory()
+    end = time.time()
+    start = end - 3600
+    for segment_start, path in history.segments():
+        count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(segment_start))}  {count} records  {path}")
+
+    points = history.positions("right_index", start, end)
+    print(f"right_index samples in the last hour: {len(points)}")
+    hist = history.histogram2d("right_wrist", start, end, bins=8)
+    print("right_wrist heatmap (8x8, rows = x):")
+    print(hist)
+    print(f"Right hand gestures in the last hour: {history.gesture_counts('Right', start, end)}")
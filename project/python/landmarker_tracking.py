@@ -0,0 +1,196 @@
+"""
+Tracker backend built on the MediaPipe Tasks API (PoseLandmarker /
+HandLandmarker in LIVE_STREAM mode).
+
+The legacy trackers call process() and wait for it, so capture and inference
+run strictly one after the other. Here the capture thread only hands
+timestamped frames to detect_async(); inference runs on MediaPipe's own
+thread and results come back through a callback, which publishes them
+through the same get_pose_data()/get_hands_data() interface. When inference
+falls behind, MediaPipe drops frames itself instead of queueing them.
+
+The .task model files are downloaded with `make models`.
+Select this backend in main.py with TRACKER_BACKEND=tasks.
+"""
+
+import os
+import time
+import functools
+import threading
+import logging
+import log_setup
+import cv2
+import mediapipe as mp
+import numpy as np
+from mediapipe.tasks import python as mp_tasks
+from mediapipe.tasks.python import vision
+from pose_tracking import PoseTracker, KEYPOINTS
+from hand_tracking import HandTracker
+
+logger = logging.getLogger("LandmarkerTracking")
+
+POSE_MODEL_PATH = os.getenv("POSE_LANDMARKER_MODEL", "models/pose_landmarker_full.task")
+HAND_MODEL_PATH = os.getenv("HAND_LANDMARKER_MODEL", "models/hand_landmarker.task")
+
+
+class LiveStreamMixin:
+    """
+    Capture loop and warm-up shared by both landmarkers. Subclasses provide
+    _create_model() and _handle_result(result, image, capture_time).
+    """
+
+    reuse_model = False  # _run_loop closes the landmarker, and its callback is bound to one generation
+
+    def _init_live_stream(self):
+        self.last_timestamp_ms = 0  # detect_async() needs strictly increasing timestamps
+        self.warmup_frames = 0  # Results with timestamps up to this are warm-up frames
+        self.warmup_done = threading.Event()
+
+    def warm_up(self, frames=3, size=(480, 640), timeout=10.0):
+        """
+        Sends a few blank frames and waits for their results, so graph setup
+        and the first (slow) inference happen before the show.
+        """
+        start = time.time()
+        model = self.model
+        blank = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.zeros((size[0], size[1], 3), dtype=np.uint8))
+        self.warmup_done.clear()
+        self.warmup_frames = frames
+        for i in range(1, frames + 1):
+            model.detect_async(blank, i)
+        self.last_timestamp_ms = frames
+        if not self.warmup_done.wait(timeout):
+            logger.warning(f"{self.name} warm-up timed out after {timeout:.0f}s")
+        logger.info(f"{self.name} model warmed up in {time.time() - start:.2f}s")
+
+    def _run_loop(self, generation):
+        # Keep a reference: restart() may swap in a new landmarker for the next thread
+        model = self.model
+        if self.show_window:
+            logger.info(f"{self.name}: no local window with the Tasks backend; use camera_viewer.py")
+            self.show_window = False
+
+        cap = self._open_capture(generation)
+        if cap is None:
+            model.close()
+            return
+
+        try:
+            while self.running and generation == self.generation:
+                success, image = cap.read()
+                if not success:
+                    logger.warning("Ignoring empty camera frame.")
+                    continue
+                capture_time = time.monotonic()
+
+                image = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
+                # The timestamp doubles as the capture time, so the callback can recover it
+                timestamp_ms = max(int(capture_time * 1000), self.last_timestamp_ms + 1)
+                self.last_timestamp_ms = timestamp_ms
+                # Returns immediately; the result arrives in _on_result()
+                model.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=image), timestamp_ms)
+        finally:
+            cap.release()
+            model.close()
+
+    def _on_result(self, generation, result, output_image, timestamp_ms):
+        # Runs on MediaPipe's thread
+        if timestamp_ms <= self.warmup_frames:
+            if timestamp_ms == self.warmup_frames:
+                self.warmup_done.set()
+            return
+        if generation != self.generation:
+            return  # Late result from a landmarker that restart() replaced
+        self.last_heartbeat = time.time()
+        try:
+            # The output image is only valid during the callback
+            image = np.copy(output_image.numpy_view())
+            self._handle_result(result, image, timestamp_ms / 1000.0)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"{self.name} result callback failed: {e}")
+
+
+class PoseLandmarkerTracker(LiveStreamMixin, PoseTracker):
+    """PoseTracker on the Tasks API; tracks up to `num_poses` people."""
+
+    name = "Pose landmarker"
+
+    def __init__(self, source=0, show_window=False, num_poses=2, model_path=POSE_MODEL_PATH,
+                 segmentation=False, silhouette_fps=10):
+        self.num_poses = num_poses
+        self.model_path = model_path
+        self._init_live_stream()
+        super().__init__(source=source, show_window=show_window,
+                         segmentation=segmentation, silhouette_fps=silhouette_fps)
+
+    def _create_model(self):
+        options = vision.PoseLandmarkerOptions(
+            base_options=mp_tasks.BaseOptions(model_asset_path=self.model_path),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_poses=self.num_poses,
+            min_pose_detection_confidence=0.5,
+            min_pose_presence_confidence=0.5,
+            min_tracking_confidence=0.5,
+            output_segmentation_masks=self.segmentation,
+            result_callback=functools.partial(self._on_result, self.generation),
+        )
+        return vision.PoseLandmarker.create_from_options(options)
+
+    def _handle_result(self, result, image, capture_time):
+        # Widest shoulders first: the person closest to the camera drives the visuals
+        left = KEYPOINTS["left_shoulder"]
+        right = KEYPOINTS["right_shoulder"]
+        people = sorted(result.pose_landmarks, key=lambda lm: -abs(lm[left].x - lm[right].x))
+        self._publish_people(people, capture_time, image)
+        if self.segmentation:
+            # One mask per detected person; the silhouette outlines all of them
+            masks = [mask.numpy_view() for mask in result.segmentation_masks or []]
+            self._publish_silhouette(np.max(masks, axis=0) if masks else None, capture_time)
+
+
+class HandLandmarkerTracker(LiveStreamMixin, HandTracker):
+    """HandTracker on the Tasks API."""
+
+    name = "Hand landmarker"
+
+    def __init__(self, source=0, show_window=False, gesture_templates="gesture_templates.npz",
+                 num_hands=2, model_path=HAND_MODEL_PATH):
+        self.num_hands = num_hands
+        self.model_path = model_path
+        self._init_live_stream()
+        super().__init__(source=source, show_window=show_window, gesture_templates=gesture_templates)
+
+    def _create_model(self):
+        options = vision.HandLandmarkerOptions(
+            base_options=mp_tasks.BaseOptions(model_asset_path=self.model_path),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_hands=self.num_hands,
+            min_hand_detection_confidence=0.5,
+            min_hand_presence_confidence=0.5,
+            min_tracking_confidence=0.5,
+            result_callback=functools.partial(self._on_result, self.generation),
+        )
+        return vision.HandLandmarker.create_from_options(options)
+
+    def _handle_result(self, result, image, capture_time):
+        batch = np.array([[(l.x, l.y) for l in hand] for hand in result.hand_landmarks],
+                         dtype=np.float32).reshape(-1, 21, 2)
+        hand_labels = [handedness[0].category_name for handedness in result.handedness]
+        hand_scores = [handedness[0].score for handedness in result.handedness]
+        self._publish_hands(batch, hand_labels, hand_scores, capture_time)
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    tracker = PoseLandmarkerTracker()
+    tracker.warm_up()
+    tracker.start()
+    try:
+        while True:
+            data = tracker.get_pose_data()
+            if data:
+                print(data)
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        tracker.stop()
@@ -0,0 +1,166 @@
+"""
+Process-wide logging setup for the backend and tools.
+
+Library modules only create loggers; entry points call configure() once.
+Records are handed to a QueueHandler and written by a QueueListener thread,
+so tracker threads and the event loop never block on stderr or disk. A
+rate-limit filter in front of the queue lets through a few records per call
+site per interval (errors always pass) and folds the rest into a "[N similar suppressed]" note on
+the next one that passes, so a hot loop (e.g. "Ignoring empty camera frame."
+while a camera is unplugged) can't flood the log or cost frames.
+
+Environment:
+  LOG_LEVEL      INFO by default
+  LOG_FILE       also write here, rotated at LOG_MAX_BYTES (10 MB) x LOG_BACKUPS (3);
+                 stderr output is then off unless LOG_STDERR=1
+  LOG_FORMAT     "json" for one JSON object per line
+  LOG_RATE       records per call site per LOG_RATE_INTERVAL seconds (5 per 10 s)
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Allows `burst` records per call site (logger, file, line) every `interval`
+    seconds. Call sites are used rather than messages because most messages
+    here are f-strings that differ on every call. ERROR and above always pass.
+    """
+
+    def __init__(self, burst=5, interval=10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.sites = {}  # (name, pathname, lineno) -> [window start, passed, suppressed]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None or now - site[0] >= self.interval:
+                suppressed = site[2] if site else 0
+                self.sites[key] = [now, 1, 0]
+            elif site[1] < self.burst:
+                site[1] += 1
+                suppressed = 0
+            else:
+                site[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} [{suppressed} similar suppressed]"
+            record.args = None
+        return True
+
+    def pending(self):
+        """(logger name, suppressed count) for call sites whose suppressed records were never reported."""
+        with self.lock:
+            return [(key[0], site[2]) for key, site in self.sites.items() if site[2]]
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking or raising."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def configure(level=None, log_file=None, json_format=None):
+    """Sets up non-blocking logging for this process (idempotent). Returns the root QueueHandler."""
+    global _listener
+    root = logging.getLogger()
+    if _listener is not None:
+        return next(h for h in root.handlers if isinstance(h, DroppingQueueHandler))
+
+    level = level or os.getenv("LOG_LEVEL", "INFO").upper()
+    log_file = log_file or os.getenv("LOG_FILE")
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "").lower() == "json"
+    formatter = JsonFormatter() if json_format else \
+        logging.Formatter("%(asctime)s %(levelname)s:%(name)s:%(message)s")
+
+    handlers = []
+    if not log_file or os.getenv("LOG_STDERR") == "1":
+        handlers.append(logging.StreamHandler(sys.stderr))
+    if log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+            backupCount=int(os.getenv("LOG_BACKUPS", "3"))))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=10000)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(int(os.getenv("LOG_RATE", "5")),
+                                            float(os.getenv("LOG_RATE_INTERVAL", "10"))))
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+    return queue_handler
+
+
+def shutdown():
+    """Reports outstanding suppressed/dropped counts and flushes the queue."""
+    global _listener
+    if _listener is None:
+        return
+    logger = logging.getLogger("Logging")
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            for rate_filter in handler.filters:
+                for name, count in rate_filter.pending():
+                    logger.info(f"{count} more {name} messages were suppressed")
+            if handler.dropped:
+                logger.warning(f"{handler.dropped} log records dropped (queue full)")
+    _listener.stop()
+    _listener = None
+
+
+if __name__ == "__main__":
+    # A hot loop logs 10000 warnings; only a handful reach the output
+    configure()
+    demo = logging.getLogger("Demo")
+    start = time.perf_counter()
+    for _ in range(10000):
+        demo.warning("Ignoring empty camera frame.")
+    demo.info(f"10000 warnings logged in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -1,49 +1,177 @@
 import asyncio
 import logging
+import log_setup
 import json
 import os
+import signal
 import time
 from websocket_server import WebSocketServer
+from asset_server import AssetServer
 from pose_tracking import PoseTracker
 from hand_tracking import HandTracker
 from visual_logic import VisualLogic
 from ai_visual_generation import AIVisualGenerator
+from supervisor import Supervisor
+from preview_stream import PreviewStream
+from landmark_history import LandmarkHistoryWriter
+from sampling_profiler import SamplingProfiler
+from calibration import CalibrationService
+from multi_camera import CameraRig, MultiCameraPoseTracker, MultiCameraHandTracker
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Main")
 
-async def main():
-    # Initialize components
-    server = WebSocketServer(port=8765)
-    tracker = PoseTracker()
-    hand_tracker = HandTracker(show_window=False)  # Disable window to avoid conflicts
-    logic = VisualLogic()
-    ai_gen = AIVisualGenerator(output_dir="../web/visuals/textures")
+# "legacy" (mp.solutions, synchronous) or "tasks" (MediaPipe Tasks, LIVE_STREAM)
+TRACKER_BACKEND = os.getenv("TRACKER_BACKEND", "legacy")
+# Body silhouette updates per second from pose segmentation (0 = segmentation off)
+SILHOUETTE_FPS = float(os.getenv("SILHOUETTE_FPS", "0"))
+# Camera indices or stream URLs; several (e.g. "0,1") are fused into one stage space (see multi_camera.py)
+CAMERA_SOURCES = [int(s) if s.strip().isdigit() else s.strip() for s in os.getenv("CAMERA_SOURCES", "0").split(",")]
+
+def make_pose_tracker(source):
+    if TRACKER_BACKEND == "tasks":
+        from landmarker_tracking import PoseLandmarkerTracker
+        return PoseLandmarkerTracker(source=source, num_poses=int(os.getenv("NUM_POSES", "2")),
+                                     segmentation=SILHOUETTE_FPS > 0, silhouette_fps=SILHOUETTE_FPS)
+    # Use camera_viewer.py (preview stream) to watch
+    return PoseTracker(source=source, show_window=False,
+                       segmentation=SILHOUETTE_FPS > 0, silhouette_fps=SILHOUETTE_FPS)
 
-    # Start components
+def make_hand_tracker(source):
+    if TRACKER_BACKEND == "tasks":
+        from landmarker_tracking import HandLandmarkerTracker
+        return HandLandmarkerTracker(source=source)
+    return HandTracker(source=source, show_window=False)  # Disable window to avoid conflicts
+
+def create_pose_tracker(rig=None):
+    if rig:
+        tracker = MultiCameraPoseTracker([make_pose_tracker(source) for source in CAMERA_SOURCES], rig)
+    else:
+        tracker = make_pose_tracker(CAMERA_SOURCES[0])
+    tracker.warm_up()
     tracker.start()
+    return tracker
+
+def create_hand_tracker(rig=None):
+    if rig:
+        hand_tracker = MultiCameraHandTracker([make_hand_tracker(source) for source in CAMERA_SOURCES], rig)
+    else:
+        hand_tracker = make_hand_tracker(CAMERA_SOURCES[0])
+    hand_tracker.warm_up()
     hand_tracker.start()  # Start hand tracking
+    return hand_tracker
+
+def create_generator():
+    ai_gen = AIVisualGenerator(
+        output_dir="../web/visuals/textures",
+        pool_prompts=VisualLogic.TEXTURE_PROMPTS,
+        pool_size=3,
+        pool_budget_per_hour=30
+    )
     ai_gen.start()
-    
-    # Start WebSocket server in background
+    return ai_gen
+
+async def main():
+    # Use BIND_HOST=0.0.0.0 to let relays / projector machines on the network connect
+    bind_host = os.getenv("BIND_HOST", "localhost")
+    server = WebSocketServer(host=bind_host, port=8765)
+    assets = AssetServer(root="../web", host=bind_host, port=8000)
+    logic = VisualLogic()
+
+    # Start the servers first so clients can connect (and see warm-up status) right away
     server_task = asyncio.create_task(server.start())
+    # Static files and generated textures are served from this same loop
+    assets_task = asyncio.create_task(assets.start())
+    await server.set_status("Warming up...")
+
+    # Per-camera stage transforms when several cameras cover the stage
+    rig = CameraRig(len(CAMERA_SOURCES)) if len(CAMERA_SOURCES) > 1 else None
+
+    # Load and warm up the models in parallel instead of one after another
+    start_time = time.time()
+    loop = asyncio.get_running_loop()
+    tracker, hand_tracker, ai_gen = await asyncio.gather(
+        loop.run_in_executor(None, create_pose_tracker, rig),
+        loop.run_in_executor(None, create_hand_tracker, rig),
+        loop.run_in_executor(None, create_generator),
+    )
 
-    logger.info("System initialized. Loop starting...")
+    # Hands are matched to the people of the pose tracker on the same camera
+    for pose_tracker, camera_hand_tracker in zip(getattr(tracker, "trackers", [tracker]),
+                                                  getattr(hand_tracker, "trackers", [hand_tracker])):
+        camera_hand_tracker.pose_source = pose_tracker
+
+    logger.info(f"System initialized in {time.time() - start_time:.2f}s. Loop starting...")
+    await server.set_status("Ready", ready=True)
+
+    # Restart trackers/generator if their thread dies or stops producing output
+    supervisor = Supervisor(server)
+    # (each camera's trackers individually with several cameras)
+    for name, component in (("pose tracker", tracker), ("hand tracker", hand_tracker)):
+        cameras = getattr(component, "trackers", [component])
+        for index, camera_tracker in enumerate(cameras):
+            label = f"{name} (camera {index})" if len(cameras) > 1 else name
+            supervisor.watch(label, camera_tracker, stall_timeout=0.5)
+    supervisor.watch("AI generator", ai_gen, stall_timeout=120.0)
+    supervisor_task = asyncio.create_task(supervisor.run())
+
+    # Annotated debug preview for camera_viewer.py; idle unless someone is watching
+    preview = PreviewStream(tracker, hand_tracker, fps=10)
+    assets.add_route("/preview.mjpeg", preview.handle)
+    preview_task = asyncio.create_task(preview.run())
+
+    # Append-only landmark log for heatmaps / offline tuning (see landmark_history.py)
+    history = LandmarkHistoryWriter(directory=os.getenv("HISTORY_DIR", "history"))
+    history.start()
+
+    # Camera -> projector mapping, (re)calibrated with `camera_viewer.py --calibrate`
+    calibration = CalibrationService(server, path=os.getenv("CALIBRATION_FILE", "calibration.json"), rig=rig)
+    server.add_control_handler("calibration", calibration.handle_control)
+
+    # Live profiling without a restart: `kill -USR1 <pid>` or a "profile" control message
+    profiler = SamplingProfiler(output_dir=os.getenv("PROFILE_DIR", "profiles"))
+    server.add_control_handler("profile", profiler.handle_control)
+    if hasattr(signal, "SIGUSR1"):
+        loop.add_signal_handler(signal.SIGUSR1, profiler.toggle)
+    last_logged_timestamp = None
+    last_silhouette = None
 
     last_gen_time = 0
     gen_interval = 10.0 # Generate every 10 seconds
+    idle_after = 5.0 # Seconds without a detected pose before the pool may refill
+    stale_after = 1.0 # Don't keep re-sending a pose the tracker stopped updating
+    loop_count = 0
+    last_stats_time = time.time()
 
     try:
         while True:
             # 1. Get Pose Data
             pose_data = tracker.get_pose_data()
             hands_data = hand_tracker.get_hands_data()  # Get hand gestures
+            silhouette = tracker.get_silhouette_data()
+            if silhouette is last_silhouette:
+                silhouette = None  # Only sent when a new one is traced (SILHOUETTE_FPS)
+            else:
+                last_silhouette = silhouette
             current_time = time.time()
+
+            # Nobody in frame -> let the generator pre-warm its texture pool
+            ai_gen.set_idle(not pose_data or current_time - pose_data["timestamp"] > idle_after)
             
-            if pose_data:
+            if pose_data and current_time - pose_data["timestamp"] < stale_after:
+                # Log each new pose once (the loop runs faster than the camera)
+                if pose_data["timestamp"] != last_logged_timestamp:
+                    # One record per tracked person; hands aren't matched to people, so they go with the primary
+                    for person, person_pose in enumerate(pose_data.get("people", [pose_data])):
+                        history.append(person_pose, hands_data if person == 0 else None, person=person)
+                    last_logged_timestamp = pose_data["timestamp"]
+
+                # Projector coordinates from here on: one vectorized transform per new
+                # frame, so clients (and command positions) need no per-point maths
+                stage = calibration.calibration
+                stage_pose = stage.map_pose(pose_data)
+
                 # 2. Process Logic
-                commands = logic.process(pose_data)
+                commands = logic.process(stage_pose)
                 
                 # 3. Handle AI Generation Commands (Manual Trigger)
                 for cmd in commands:
@@ -52,16 +180,31 @@ async def main():
                         prefix = cmd["params"]["type"]
                         ai_gen.request_generation(prompt, prefix)
 
-                # 4. Prepare Message with gesture data
-                message = {
-                    "type": "update",
-                    "pose": pose_data,
-                    "hands": hands_data,  # Include hand gesture data
+                # 4. Publish to Clients (each gets its subscribed topics at its own rate)
+                await server.publish("update", {
+                    "pose": stage_pose,
+                    "hands": stage.map_hands(hands_data),  # Include hand gesture data
+                    "silhouette": stage.map_silhouette(silhouette),
                     "commands": commands
-                }
-                
-                # 5. Broadcast to Clients
-                await server.broadcast(message)
+                })
+
+            # 5. Announce finished textures (URLs are content-hashed and cacheable)
+            for event in ai_gen.get_results():
+                await server.publish_event("textures", event)
+
+            # 6. Backend stats for dashboards, once per second
+            loop_count += 1
+            if current_time - last_stats_time >= 1.0:
+                await server.publish("stats", {"stats": {
+                    "loop_hz": loop_count / (current_time - last_stats_time),
+                    "clients": len(server.clients),
+                    "client_feedback": server.client_summary(),
+                    "texture_pool": ai_gen.pool_levels(),
+                    "ai_provider": ai_gen.provider_status(),
+                    "history_dropped": history.dropped
+                }})
+                loop_count = 0
+                last_stats_time = current_time
 
             # Control loop rate (approx 60 FPS)
             await asyncio.sleep(0.016)
@@ -72,8 +215,11 @@ async def main():
         tracker.stop()
         hand_tracker.stop()  # Stop hand tracking
         ai_gen.stop()
+        history.stop()
+        profiler.stop()
 
 if __name__ == "__main__":
+    log_setup.configure()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,255 @@
+"""
+Multi-camera capture fused into one stage coordinate space.
+
+Each camera runs its own PoseTracker/HandTracker (own capture thread, own
+model, so cameras are processed in parallel). A CameraRig holds one
+Calibration per camera mapping its normalized image coordinates into the
+shared stage space (calibration-cam<i>.json, solved with
+`camera_viewer.py --calibrate --camera <i>`).
+
+MultiCameraPoseTracker / MultiCameraHandTracker expose the single-tracker
+interface (get_pose_data(), get_hands_data(), preview, warm_up/start/stop),
+so VisualLogic and the broadcast see one unified set of people. Detections
+of the same person seen by several cameras are merged by confidence-weighted
+averaging of their stage coordinates.
+
+Enable in main.py with CAMERA_SOURCES=0,1 (indices or stream URLs).
+"""
+
+import os
+import logging
+import time
+import numpy as np
+from calibration import Calibration, POSE_KEYPOINTS
+from silhouette import decode_contours, encode_contours
+
+logger = logging.getLogger("MultiCamera")
+
+
+class CameraRig:
+    """Per-camera camera->stage transforms, plus which camera the debug preview shows."""
+
+    def __init__(self, count, directory="."):
+        self.directory = directory
+        self.transforms = [Calibration.load(self.path(i)) for i in range(count)]
+        self.preview_camera = 0
+
+    def path(self, index):
+        return os.path.join(self.directory, f"calibration-cam{index}.json")
+
+    def set_transform(self, index, calibration):
+        calibration.save(self.path(index))
+        self.transforms[index] = calibration
+
+
+def cluster(centers, scores, cameras, radius):
+    """
+    Groups detections that are the same person: greedily, strongest first,
+    each cluster takes at most one detection per camera within `radius` of
+    its seed. Returns a list of index arrays.
+    """
+    order = np.argsort(-scores)
+    assigned = np.zeros(len(centers), dtype=bool)
+    distances = np.linalg.norm(centers[:, None, :] - centers[None, :, :], axis=2)
+    clusters = []
+    for seed in order:
+        if assigned[seed]:
+            continue
+        members = [seed]
+        assigned[seed] = True
+        for camera in np.unique(cameras):
+            if camera == cameras[seed]:
+                continue
+            candidates = np.where(~assigned & (cameras == camera) & (distances[seed] < radius))[0]
+            if len(candidates):
+                best = candidates[np.argmin(distances[seed, candidates])]
+                members.append(best)
+                assigned[best] = True
+        clusters.append(np.array(members))
+    return clusters
+
+
+class MultiCameraPoseTracker:
+    def __init__(self, trackers, rig, merge_radius=0.1, stale_after=1.0):
+        self.trackers = trackers
+        self.rig = rig
+        self.merge_radius = merge_radius  # Stage distance between shoulder centres of the same person
+        self.stale_after = stale_after  # A camera's last pose is dropped once the person leaves its view
+        self.inputs = None  # Per-camera poses the cached fusion was built from
+        self.fused = None
+        self.silhouette_inputs = None
+        self.fused_silhouette = None
+        self._preview_enabled = False
+
+    def warm_up(self, **kwargs):
+        for tracker in self.trackers:
+            tracker.warm_up(**kwargs)
+
+    def start(self):
+        for tracker in self.trackers:
+            tracker.start()
+        logger.info(f"Fusing poses from {len(self.trackers)} cameras")
+
+    def stop(self):
+        for tracker in self.trackers:
+            tracker.stop()
+
+    def get_pose_data(self):
+        """Fused pose in stage coordinates; recomputed only when a camera has a new pose."""
+        now = time.time()
+        inputs = [tracker.get_pose_data() for tracker in self.trackers]
+        inputs = [pose if pose and now - pose["timestamp"] < self.stale_after else None for pose in inputs]
+        if self.inputs is not None and all(a is b for a, b in zip(inputs, self.inputs)):
+            return self.fused
+        self.inputs = inputs
+        self.fused = self._fuse(inputs)
+        return self.fused
+
+    def _fuse(self, inputs):
+        detections, cameras = [], []
+        for camera, pose in enumerate(inputs):
+            if pose is None:
+                continue
+            stage_pose = self.rig.transforms[camera].map_pose(pose)
+            for person in stage_pose.get("people", [stage_pose]):
+                detections.append(person)
+                cameras.append(camera)
+        if not detections:
+            return None
+
+        names = [name for name in POSE_KEYPOINTS if name in detections[0]]
+        points = np.array([[person[name] for name in names] for person in detections])  # (D, K, 2)
+        scores = np.array([person.get("score", 1.0) for person in detections])
+        left, right = names.index("left_shoulder"), names.index("right_shoulder")
+        centers = (points[:, left] + points[:, right]) / 2
+
+        people = []
+        for members in cluster(centers, scores, np.array(cameras), self.merge_radius):
+            weights = (scores[members] + 1e-6) / (scores[members] + 1e-6).sum()
+            fused_points = np.tensordot(weights, points[members], axes=1)  # (K, 2)
+            person = {
+                "timestamp": max(detections[i]["timestamp"] for i in members),
+                "capture_time": max(detections[i]["capture_time"] for i in members),
+                "score": float(scores[members].max()),
+                "cameras": sorted(cameras[i] for i in members),
+            }
+            person.update(zip(names, fused_points.tolist()))
+            people.append(person)
+
+        # Widest shoulders first: the person closest to a camera drives the visuals
+        people.sort(key=lambda p: -abs(p["left_shoulder"][0] - p["right_shoulder"][0]))
+        return dict(people[0], people=people) if len(people) > 1 else people[0]
+
+    def get_silhouette_data(self):
+        """Outlines from every camera, mapped to stage coordinates and packed into one blob."""
+        inputs = [tracker.get_silhouette_data() for tracker in self.trackers]
+        if self.silhouette_inputs is not None and all(a is b for a, b in zip(inputs, self.silhouette_inputs)):
+            return self.fused_silhouette
+        self.silhouette_inputs = inputs
+        present = [(camera, s) for camera, s in enumerate(inputs) if s is not None]
+        if not present:
+            self.fused_silhouette = None
+            return None
+        contours = []
+        for camera, silhouette in present:
+            contours += decode_contours(self.rig.transforms[camera].map_silhouette(silhouette)["contours"])
+        self.fused_silhouette = {
+            "capture_time": max(s["capture_time"] for _, s in present),
+            "points": sum(len(c) for c in contours),
+            "contours": encode_contours(contours),
+        }
+        return self.fused_silhouette
+
+    def get_current_frame(self):
+        return self.trackers[self.rig.preview_camera].get_current_frame()
+
+    # Debug preview shows one camera at a time (rig.preview_camera)
+    @property
+    def preview_enabled(self):
+        return self._preview_enabled
+
+    @preview_enabled.setter
+    def preview_enabled(self, enabled):
+        self._preview_enabled = enabled
+        for camera, tracker in enumerate(self.trackers):
+            tracker.preview_enabled = enabled and camera == self.rig.preview_camera
+
+    def get_preview_frame(self):
+        self.preview_enabled = self._preview_enabled  # Follow preview_camera changes
+        return self.trackers[self.rig.preview_camera].get_preview_frame()
+
+
+class MultiCameraHandTracker:
+    def __init__(self, trackers, rig, merge_radius=0.08, stale_after=1.0):
+        self.trackers = trackers
+        self.rig = rig
+        self.merge_radius = merge_radius
+        self.stale_after = stale_after
+        self.inputs = None
+        self.fused = None
+        self._preview_enabled = False
+
+    def warm_up(self, **kwargs):
+        for tracker in self.trackers:
+            tracker.warm_up(**kwargs)
+
+    def start(self):
+        for tracker in self.trackers:
+            tracker.start()
+
+    def stop(self):
+        for tracker in self.trackers:
+            tracker.stop()
+
+    def get_hands_data(self):
+        now = time.time()
+        inputs = [tracker.get_hands_data() for tracker in self.trackers]
+        inputs = [data if data and now - data["timestamp"] < self.stale_after else None for data in inputs]
+        if self.inputs is not None and all(a is b for a, b in zip(inputs, self.inputs)):
+            return self.fused
+        self.inputs = inputs
+        self.fused = self._fuse(inputs)
+        return self.fused
+
+    def _fuse(self, inputs):
+        present = [(camera, data) for camera, data in enumerate(inputs) if data is not None]
+        if not present:
+            return None
+        hands, cameras = [], []
+        for camera, data in present:
+            for hand in self.rig.transforms[camera].map_hands(data)["hands"]:
+                hands.append(hand)
+                cameras.append(camera)
+
+        fused_hands = []
+        for label in ("Left", "Right"):
+            indices = [i for i, hand in enumerate(hands) if hand["hand"] == label]
+            if not indices:
+                continue
+            tips = np.array([hands[i]["index_tip"] for i in indices])
+            scores = np.array([hands[i]["confidence"] for i in indices])
+            for members in cluster(tips, scores, np.array([cameras[i] for i in indices]), self.merge_radius):
+                weights = (scores[members] + 1e-6) / (scores[members] + 1e-6).sum()
+                best = hands[indices[members[0]]]  # Strongest detection decides the gesture
+                fused_hands.append(dict(best, index_tip=(weights @ tips[members]).tolist(),
+                                        confidence=float(scores[members].max())))
+
+        return {
+            "timestamp": max(data["timestamp"] for _, data in present),
+            "capture_time": max(data["capture_time"] for _, data in present),
+            "hands": fused_hands,
+        }
+
+    @property
+    def preview_enabled(self):
+        return self._preview_enabled
+
+    @preview_enabled.setter
+    def preview_enabled(self, enabled):
+        self._preview_enabled = enabled
+        for camera, tracker in enumerate(self.trackers):
+            tracker.preview_enabled = enabled and camera == self.rig.preview_camera
+
+    def get_preview_hands(self):
+        self.preview_enabled = self._preview_enabled
+        return self.trackers[self.rig.preview_camera].get_preview_hands()
@@ -1,49 +1,81 @@
 import cv2
 import mediapipe as mp
+import numpy as np
 import time
 import threading
 import logging
+import log_setup
+from silhouette import SilhouetteExtractor, encode_contours
+from capture_tracker import CaptureTracker
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("PoseTracking")
 
-class PoseTracker:
-    def __init__(self, source=0, show_window=True):
-        self.source = source
+# Keypoints of interest sent to clients (name -> MediaPipe pose landmark index).
+# The index layout is the same for the legacy solution and the Tasks API.
+KEYPOINTS = {
+    "nose": mp.solutions.pose.PoseLandmark.NOSE,
+    "left_wrist": mp.solutions.pose.PoseLandmark.LEFT_WRIST,
+    "right_wrist": mp.solutions.pose.PoseLandmark.RIGHT_WRIST,
+    "left_index": mp.solutions.pose.PoseLandmark.LEFT_INDEX,
+    "right_index": mp.solutions.pose.PoseLandmark.RIGHT_INDEX,
+    "left_shoulder": mp.solutions.pose.PoseLandmark.LEFT_SHOULDER,
+    "right_shoulder": mp.solutions.pose.PoseLandmark.RIGHT_SHOULDER,
+}
+
+def extract_keypoints(landmarks, capture_time):
+    """Builds the client keypoint dict from one person's landmark list."""
+    # MediaPipe landmarks are normalized [0.0, 1.0]
+    keypoints = {
+        "timestamp": time.time(),
+        "capture_time": capture_time,
+    }
+    for name, index in KEYPOINTS.items():
+        keypoints[name] = [landmarks[index].x, landmarks[index].y]
+    # Detection confidence (mean keypoint visibility), used to weight multi-camera fusion
+    visibility = [landmarks[index].visibility for index in KEYPOINTS.values()]
+    keypoints["score"] = float(np.mean([1.0 if v is None else v for v in visibility]))
+    return keypoints
+
+class PoseTracker(CaptureTracker):
+    name = "Pose tracking"
+    thread_name = "PoseTracker"
+
+    def __init__(self, source=0, show_window=True, segmentation=False, silhouette_fps=10):
         self.show_window = show_window
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
+        self.latest_pose = None
+        self.latest_image = None
+        self.lock = threading.Lock()
+        self.window_created = False
+
+        # Debug preview (see PreviewStream): only filled while someone is watching
+        self.preview_enabled = False
+        self.preview_frame = None  # (RGB image, (33, 2) landmark array or None)
+
+        # Body silhouette from the segmentation mask, at a lower rate than poses
+        self.segmentation = segmentation
+        self.silhouette_interval = 1.0 / silhouette_fps if silhouette_fps else 0.0
+        self.silhouette_extractor = SilhouetteExtractor()
+        self.latest_silhouette = None
+        self.last_silhouette_time = 0.0
+
+        self._init_capture_tracker(source)
+
+    def _create_model(self):
+        return self.mp_pose.Pose(
             static_image_mode=False,
             model_complexity=1,
             smooth_landmarks=True,
+            enable_segmentation=self.segmentation,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        self.running = False
-        self.latest_pose = None
-        self.latest_image = None
-        self.lock = threading.Lock()
-        self.window_created = False
 
-    def start(self):
-        self.running = True
-        self.thread = threading.Thread(target=self._run_loop)
-        self.thread.daemon = True
-        self.thread.start()
-        logger.info("Pose tracking started.")
-
-    def stop(self):
-        self.running = False
-        if self.thread.is_alive():
-            self.thread.join()
-        logger.info("Pose tracking stopped.")
-
-    def _run_loop(self):
-        cap = cv2.VideoCapture(self.source)
-        if not cap.isOpened():
-            logger.error(f"Cannot open camera source {self.source}")
-            self.running = False
+    def _run_loop(self, generation):
+        # Keep references: restart() may swap in a new model (and lock) for the next thread
+        pose, model_lock = self.model, self.model_lock
+        cap = self._open_capture(generation)
+        if cap is None:
             return
 
         # MediaPipe drawing utilities (only if showing window)
@@ -61,11 +93,13 @@ class PoseTracker:
                 logger.warning(f"Could not create window (this is normal on some systems): {e}")
                 self.show_window = False
 
-        while self.running:
+        while self.running and generation == self.generation:
             success, image = cap.read()
             if not success:
                 logger.warning("Ignoring empty camera frame.")
                 continue
+            # Monotonic capture time; clients sync to this clock for interpolation
+            capture_time = time.monotonic()
 
             # Flip the image horizontally for a later selfie-view display
             # Convert the BGR image to RGB.
@@ -74,40 +108,29 @@ class PoseTracker:
             # To improve performance, optionally mark the image as not writeable to
             # pass by reference.
             image.flags.writeable = False
-            results = self.pose.process(image)
+            with model_lock:
+                if generation != self.generation:
+                    break  # Replaced while waiting for the camera; the model may be the new thread's now
+                results = pose.process(image)
+            self.last_heartbeat = time.time()
 
             # Draw the pose annotation on the image.
             image.flags.writeable = True
             image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
 
-            if results.pose_landmarks:
-                landmarks = results.pose_landmarks.landmark
-                
-                # Draw pose landmarks on the image (only if showing window)
-                if self.show_window and self.window_created:
-                    mp_drawing.draw_landmarks(
-                        image_bgr,
-                        results.pose_landmarks,
-                        self.mp_pose.POSE_CONNECTIONS,
-                        landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
-                    )
-                
-                # Extract keypoints of interest
-                # MediaPipe landmarks are normalized [0.0, 1.0]
-                keypoints = {
-                    "timestamp": time.time(),
-                    "nose": [landmarks[self.mp_pose.PoseLandmark.NOSE].x, landmarks[self.mp_pose.PoseLandmark.NOSE].y],
-                    "left_wrist": [landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST].x, landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST].y],
-                    "right_wrist": [landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST].x, landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST].y],
-                    "left_index": [landmarks[self.mp_pose.PoseLandmark.LEFT_INDEX].x, landmarks[self.mp_pose.PoseLandmark.LEFT_INDEX].y],
-                    "right_index": [landmarks[self.mp_pose.PoseLandmark.RIGHT_INDEX].x, landmarks[self.mp_pose.PoseLandmark.RIGHT_INDEX].y],
-                    "left_shoulder": [landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER].x, landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER].y],
-                    "right_shoulder": [landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER].x, landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER].y],
-                }
-
-                with self.lock:
-                    self.latest_pose = keypoints
-                    self.latest_image = image # Store RGB image
+            # Draw pose landmarks on the image (only if showing window)
+            if results.pose_landmarks and self.show_window and self.window_created:
+                mp_drawing.draw_landmarks(
+                    image_bgr,
+                    results.pose_landmarks,
+                    self.mp_pose.POSE_CONNECTIONS,
+                    landmark_drawing_spec=mp_drawing_styles.get_default_pose_landmarks_style()
+                )
+
+            people = [results.pose_landmarks.landmark] if results.pose_landmarks else []
+            self._publish_people(people, capture_time, image)
+            if self.segmentation:
+                self._publish_silhouette(results.segmentation_mask, capture_time)
 
             # Display the image with pose landmarks (only if window was created)
             if self.show_window and self.window_created:
@@ -133,6 +156,39 @@ class PoseTracker:
             except:
                 pass
 
+    def _publish_people(self, people, capture_time, image):
+        """
+        Stores the keypoints of the detected people (landmark lists, primary
+        first) for get_pose_data(), plus the debug preview if enabled. With
+        more than one person the primary pose also carries a "people" list.
+        """
+        if people:
+            keypoints = [extract_keypoints(landmarks, capture_time) for landmarks in people]
+            primary = keypoints[0]
+            if len(keypoints) > 1:
+                primary = dict(primary, people=keypoints)
+            with self.lock:
+                self.latest_pose = primary
+                self.latest_image = image # Store RGB image
+
+        if self.preview_enabled:
+            points = None
+            if people:
+                points = np.array([(l.x, l.y) for l in people[0]], dtype=np.float32)
+            with self.lock:
+                self.preview_frame = (image, points)
+
+    def _publish_silhouette(self, mask, capture_time):
+        """Traces the segmentation mask into contour polylines, at most silhouette_fps times a second."""
+        if capture_time - self.last_silhouette_time < self.silhouette_interval:
+            return
+        self.last_silhouette_time = capture_time
+        if mask is None:
+            silhouette = {"capture_time": capture_time, "points": 0, "contours": encode_contours([])}
+        else:
+            silhouette = self.silhouette_extractor.extract(mask, capture_time)
+        with self.lock:
+            self.latest_silhouette = silhouette
 
     def get_current_frame(self):
         """Returns the latest captured frame (RGB) or None."""
@@ -142,13 +198,24 @@ class PoseTracker:
                 return self.latest_image.copy()
             return None
 
+    def get_preview_frame(self):
+        """Returns (RGB image, landmark array or None) for the debug preview, or None."""
+        with self.lock:
+            return self.preview_frame
+
     def get_pose_data(self):
         """Returns the latest pose keypoints data."""
         with self.lock:
             return self.latest_pose
 
+    def get_silhouette_data(self):
+        """Returns the latest silhouette ({"capture_time", "points", "contours"}) or None."""
+        with self.lock:
+            return self.latest_silhouette
+
 
 if __name__ == "__main__":
+    log_setup.configure()
     tracker = PoseTracker()
     tracker.start()
     try:
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+import cv2
+import mediapipe as mp
+
+logger = logging.getLogger("PreviewStream")
+
+BOUNDARY = "frame"
+
+GESTURE_COLORS = {
+    "fist": (0, 0, 255),  # Red
+    "pointing": (0, 255, 255),  # Yellow
+    "open_palm": (0, 255, 0),  # Green
+    "bunny": (255, 0, 255),  # Pink/Magenta
+}
+
+
+class PreviewStream:
+    """
+    Low-rate annotated MJPEG preview of what the backend trackers see,
+    served by the AssetServer at /preview.mjpeg.
+
+    Frames come from the running PoseTracker/HandTracker (no second camera,
+    no extra inference). Trackers only keep preview data, and frames are
+    only drawn and encoded, while at least one client is subscribed.
+    """
+
+    def __init__(self, pose_tracker, hand_tracker=None, fps=10, width=640, quality=70):
+        self.pose_tracker = pose_tracker
+        self.hand_tracker = hand_tracker
+        self.interval = 1.0 / fps
+        self.width = width
+        self.quality = quality
+        self.subscribers = set()  # One asyncio.Queue(maxsize=1) per viewer
+        self.has_subscribers = asyncio.Event()
+
+        self.pose_connections = mp.solutions.pose.POSE_CONNECTIONS
+        self.hand_connections = mp.solutions.hands.HAND_CONNECTIONS
+
+    async def handle(self, writer, headers, method):
+        """AssetServer route handler: streams multipart JPEG frames until the client leaves."""
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            f"Content-Type: multipart/x-mixed-replace; boundary={BOUNDARY}\r\n"
+            "Cache-Control: no-store\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("latin-1"))
+        await writer.drain()
+        if method == "HEAD":
+            return
+
+        frames = asyncio.Queue(maxsize=1)
+        self._set_subscribed(frames, True)
+        try:
+            while True:
+                jpeg = await frames.get()
+                writer.write((
+                    f"--{BOUNDARY}\r\n"
+                    "Content-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(jpeg)}\r\n\r\n"
+                ).encode("latin-1") + jpeg + b"\r\n")
+                await writer.drain()
+        finally:
+            self._set_subscribed(frames, False)
+
+    def _set_subscribed(self, frames, subscribed):
+        if subscribed:
+            self.subscribers.add(frames)
+        else:
+            self.subscribers.discard(frames)
+
+        active = bool(self.subscribers)
+        self.pose_tracker.preview_enabled = active
+        if self.hand_tracker:
+            self.hand_tracker.preview_enabled = active
+        if active:
+            self.has_subscribers.set()
+        else:
+            self.has_subscribers.clear()
+        logger.info(f"Preview viewers: {len(self.subscribers)}")
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Costs nothing while nobody is watching
+            await self.has_subscribers.wait()
+
+            start = time.time()
+            frame = self.pose_tracker.get_preview_frame()
+            hands = self.hand_tracker.get_preview_hands() if self.hand_tracker else []
+            if frame is not None:
+                jpeg = await loop.run_in_executor(None, self._render, frame, hands)
+                if jpeg:
+                    for frames in list(self.subscribers):
+                        # Slow viewers just skip frames
+                        if frames.full():
+                            frames.get_nowait()
+                        frames.put_nowait(jpeg)
+
+            await asyncio.sleep(max(0.0, self.interval - (time.time() - start)))
+
+    def _render(self, frame, hands):
+        image, pose_points = frame
+        h, w = image.shape[:2]
+        scale = self.width / w
+        image_bgr = cv2.cvtColor(cv2.resize(image, (self.width, int(h * scale))), cv2.COLOR_RGB2BGR)
+        h, w = image_bgr.shape[:2]
+
+        if pose_points is not None:
+            self._draw_landmarks(image_bgr, pose_points, self.pose_connections, (255, 255, 255), (0, 0, 255))
+        cv2.putText(image_bgr, 'Pose: DETECTED' if pose_points is not None else 'Pose: NOT DETECTED',
+                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7,
+                    (0, 255, 0) if pose_points is not None else (0, 0, 255), 2)
+
+        y_offset = 60
+        for points, hand_label, gesture in hands:
+            color = GESTURE_COLORS.get(gesture, (255, 255, 255))
+            self._draw_landmarks(image_bgr, points, self.hand_connections, color, color)
+            text = f"{hand_label}: {gesture.upper()}"
+            wrist_x, wrist_y = int(points[0][0] * w), int(points[0][1] * h)
+            cv2.putText(image_bgr, text, (wrist_x, wrist_y - 20),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2, cv2.LINE_AA)
+            cv2.putText(image_bgr, text, (10, y_offset),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+            y_offset += 30
+
+        success, buffer = cv2.imencode(".jpg", image_bgr, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return buffer.tobytes() if success else None
+
+    def _draw_landmarks(self, image_bgr, points, connections, line_color, point_color):
+        h, w = image_bgr.shape[:2]
+        pixels = [tuple(p) for p in (points * (w, h)).astype(int).tolist()]
+        for start, end in connections:
+            cv2.line(image_bgr, pixels[start], pixels[end], line_color, 2)
+        for pixel in pixels:
+            cv2.circle(image_bgr, pixel, 3, point_color, -1)
@@ -0,0 +1,221 @@
+"""
+Resilience layer for the remote image providers (Gemini/Imagen, OpenAI).
+
+ProviderGuard.call() wraps a single API call with:
+  - a hard deadline (the call runs on its own daemon thread; a hung request
+    is abandoned instead of blocking the generator),
+  - a token bucket, pushed back by 429 / Retry-After hints,
+  - an adaptive concurrency limit (AIMD on observed latency),
+  - a circuit breaker that opens after consecutive failures.
+
+When any of these says no, call() raises ProviderUnavailable right away, so
+the generator can fall back to the local style-transfer/mock path in
+milliseconds instead of waiting on a provider that is down.
+"""
+
+import threading
+import logging
+import time
+
+logger = logging.getLogger("ProviderResilience")
+
+
+class ProviderUnavailable(Exception):
+    """The call was not attempted (circuit open, rate limited or at the concurrency limit)."""
+
+
+class ProviderTimeout(Exception):
+    """The call did not finish before its deadline."""
+
+
+def retry_after_from(error, default=30.0):
+    """
+    Seconds to back off if `error` is a rate-limit response (HTTP 429 from
+    requests/openai/google-api-core), else None.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    code = getattr(error, "code", None)
+    if status != 429 and not (isinstance(code, int) and code == 429) \
+            and type(error).__name__ not in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+        return None
+
+    headers = getattr(response, "headers", None)
+    if headers:
+        try:
+            return max(0.0, float(headers.get("retry-after")))
+        except (TypeError, ValueError):
+            pass
+    return default
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute=10.0, burst=3):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # Set from Retry-After hints
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return False
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1.0:
+                return False
+            self.tokens -= 1.0
+            return True
+
+    def back_off(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit: grows by
+    about one slot per window of fast successes, halves on a failure or a
+    call slower than `target_latency`.
+    """
+
+    def __init__(self, initial=1, minimum=1, maximum=4, target_latency=20.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def try_acquire(self, timeout=0.0):
+        """Takes a slot, waiting up to `timeout` seconds for one to free up."""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency, ok):
+        with self.condition:
+            self.in_flight -= 1
+            if ok and latency <= self.target_latency:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            else:
+                self.limit = max(self.minimum, self.limit / 2)
+            self.condition.notify()
+
+
+class CircuitBreaker:
+    """closed -> (failure_threshold consecutive failures) -> open -> (reset_timeout) -> half_open -> one trial call."""
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if now - self.opened_at >= self.reset_timeout:
+                # One trial call per reset_timeout (again if the last trial never reported back)
+                self.state = "half_open"
+                self.opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class ProviderGuard:
+    def __init__(self, name, timeout=60.0, rate_per_minute=10.0, burst=3, max_concurrency=2,
+                 target_latency=20.0, failure_threshold=3, reset_timeout=30.0):
+        self.name = name
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.limiter = AdaptiveLimiter(maximum=max_concurrency, target_latency=target_latency)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.abandoned = 0  # Timed-out calls still running (and holding their slots)
+        self.lock = threading.Lock()
+
+    def call(self, fn, *args, slot_wait=0.0, **kwargs):
+        """
+        Runs fn(*args, **kwargs) under the guard; raises ProviderUnavailable/ProviderTimeout or fn's error.
+        slot_wait: seconds to queue for a concurrency slot instead of failing straight away.
+        """
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name} circuit open")
+        if not self.bucket.try_acquire():
+            raise ProviderUnavailable(f"{self.name} rate limited")
+        if not self.limiter.try_acquire(slot_wait):
+            if self.abandoned:
+                # The slots are held by hung calls, not busy ones: count it so the circuit opens
+                self.breaker.record_failure()
+            raise ProviderUnavailable(f"{self.name} at concurrency limit ({int(self.limiter.limit)})")
+
+        outcome = {}
+        done = threading.Event()
+
+        def run():
+            start = time.monotonic()
+            try:
+                outcome["result"] = fn(*args, **kwargs)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                # The slot is held until the call really ends, so abandoned calls still count
+                self.limiter.release(time.monotonic() - start, "error" not in outcome)
+                with self.lock:
+                    if outcome.get("abandoned"):
+                        self.abandoned -= 1
+                    done.set()
+
+        threading.Thread(target=run, name=f"{self.name}-call", daemon=True).start()
+        if not done.wait(self.timeout):
+            with self.lock:
+                if not done.is_set():
+                    outcome["abandoned"] = True
+                    self.abandoned += 1
+            self.breaker.record_failure()
+            raise ProviderTimeout(f"{self.name} call exceeded {self.timeout:g}s")
+
+        error = outcome.get("error")
+        if error is None:
+            self.breaker.record_success()
+            return outcome["result"]
+
+        retry_after = retry_after_from(error)
+        if retry_after is not None:
+            logger.warning(f"{self.name} rate limited; backing off {retry_after:.0f}s")
+            self.bucket.back_off(retry_after)
+        else:
+            self.breaker.record_failure()
+        raise error
+
+    def status(self):
+        return {
+            "circuit": self.breaker.state,
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "abandoned": self.abandoned,
+        }
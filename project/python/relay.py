@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+WebSocket relay for driving many display nodes from one tracking node.
+
+The relay subscribes once to an upstream backend (main.py or another relay)
+at full rate. Updates go out exactly as received, without decoding or
+re-encoding, to clients on the default subscription (all topics, full rate
+and detail). Only clients that filter topics, cap rates or were adapted to
+reduced detail (client_stats -> adapt) cost a decode, after which the
+relay's WebSocketServer applies their gating as the backend would. Control
+messages the relay doesn't handle itself (calibration, profile) are
+forwarded upstream and the replies broadcast. Relays can be chained, so the camera machine only ever sends to a
+handful of relays no matter how many projectors are attached.
+
+Usage:
+    python relay.py --upstream ws://camera-box:8765 --port 8766
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import log_setup
+import time
+import websockets
+from websocket_server import WebSocketServer, STATE_TOPICS
+
+logger = logging.getLogger("Relay")
+
+# json.dumps keeps key order and set_status() puts "type" first, so status
+# frames can be recognised without parsing every message
+STATUS_PREFIX = '{"type": "status"'
+PONG_PREFIX = '{"type": "pong"'
+UPDATE_PREFIX = '{"type": "update"'
+
+
+class Relay:
+    def __init__(self, upstream_url, host="0.0.0.0", port=8766, reconnect_delay=1.0):
+        self.upstream_url = upstream_url
+        # Pings from downstream clients are answered in the backend's clock
+        self.server = WebSocketServer(host=host, port=port, clock=self.upstream_clock)
+        self.server.default_handler = self._forward_upstream
+        self.server.add_control_handler("snapshot", self._handle_snapshot)
+        self.undecoded = {}  # topic -> latest update frame carrying it that nobody decoded yet
+        self.upstream = None  # Connection to the backend while it is up
+        self.reconnect_delay = reconnect_delay
+        self.clock_offset = 0.0  # backend monotonic clock - our monotonic clock
+        self.clock_samples = []  # (rtt, offset) of recent pings to the backend
+
+    def upstream_clock(self):
+        return time.monotonic() + self.clock_offset
+
+    async def run(self):
+        server_task = asyncio.create_task(self.server.start())
+        try:
+            while True:
+                try:
+                    await self._relay_upstream()
+                except (OSError, websockets.exceptions.WebSocketException) as e:
+                    logger.warning(f"Upstream {self.upstream_url} unavailable: {e}")
+                await self.server.set_status("Relay waiting for tracking backend...")
+                await asyncio.sleep(self.reconnect_delay)
+        finally:
+            server_task.cancel()
+
+    async def _relay_upstream(self):
+        async with websockets.connect(self.upstream_url) as upstream:
+            logger.info(f"Connected to upstream {self.upstream_url}")
+            self.upstream = upstream
+            # Fills latest state and texture, so our clients' snapshots work right away
+            await upstream.send(json.dumps({"type": "snapshot"}))
+            pinger = asyncio.create_task(self._ping_upstream(upstream))
+            try:
+                async for payload in upstream:
+                    if not isinstance(payload, str):
+                        await self.server.broadcast_raw(payload)
+                    elif payload.startswith(PONG_PREFIX):
+                        # Reply to our own ping; not for downstream clients
+                        self._update_clock(json.loads(payload))
+                    elif payload.startswith(STATUS_PREFIX):
+                        # Replay the backend's latest status to clients that join later
+                        self.server.status_payload = payload
+                        await self.server.broadcast_raw(payload)
+                    elif payload.startswith(UPDATE_PREFIX):
+                        await self._relay_update(payload)
+                    else:
+                        await self._republish(json.loads(payload), payload)
+            finally:
+                self.upstream = None
+                pinger.cancel()
+
+    async def _relay_update(self, payload):
+        """
+        Forwards an update frame as-is to clients that take everything and
+        decodes it only if some client needs gating. Never waits on downstream
+        sends, so a stalled display can't stop us reading upstream.
+        """
+        everything, gated = [], []
+        for client, state in self.server.clients.items():
+            (everything if state.wants_everything() else gated).append(client)
+        if everything:
+            # Updates only carry "commands" when there are some; the rest is latest state
+            # that a display still busy with the previous frame can skip
+            await self.server.broadcast_raw(payload, droppable='"commands"' not in payload, clients=everything)
+        if gated:
+            message = json.loads(payload)
+            message.pop("type", None)
+            await self.server.publish("update", message, clients=gated)  # Also keeps server.latest current
+            for topic in message:
+                self.undecoded.pop(topic, None)
+        else:
+            # Decoded later, only if a client asks for a snapshot
+            for topic in STATE_TOPICS:
+                if f'"{topic}"' in payload:
+                    self.undecoded[topic] = payload
+
+    async def _handle_snapshot(self, websocket, data):
+        decoded = {}
+        for topic, payload in self.undecoded.items():
+            if payload not in decoded:
+                decoded[payload] = json.loads(payload)
+            if decoded[payload].get(topic) is not None:
+                self.server.latest[topic] = decoded[payload][topic]
+        self.undecoded.clear()
+        await self.server._handle_snapshot(websocket, data)
+
+    async def _republish(self, message, payload):
+        """Hands small upstream messages (stats, textures, snapshots) to our server by topic."""
+        message_type = message.pop("type", None)
+        if message_type == "stats" and isinstance(message.get("stats"), dict):
+            # Our clients are adapted here, so report their feedback rather than the backend's
+            message["stats"] = dict(message["stats"], clients=len(self.server.clients),
+                                    client_feedback=self.server.client_summary())
+        if message_type == "stats":
+            await self.server.publish(message_type, message)
+        elif message_type == "texture_ready":
+            await self.server.publish_event("textures", dict(message, type=message_type))
+        elif message_type == "snapshot":
+            for topic in STATE_TOPICS:
+                if message.get(topic) is not None:
+                    self.server.latest[topic] = message[topic]
+                    self.undecoded.pop(topic, None)
+            if message.get("texture"):
+                self.server.last_texture = message["texture"]
+        else:
+            # Replies to forwarded control messages (calibration, profile) go to everyone as-is
+            await self.server.broadcast_raw(payload)
+
+    async def _forward_upstream(self, websocket, message):
+        if self.upstream is None:
+            logger.warning(f"Upstream down; dropping {message.get('type')} message")
+            return
+        await self.upstream.send(json.dumps(message))
+
+    async def _ping_upstream(self, upstream, interval=2.0):
+        while True:
+            await upstream.send(json.dumps({"type": "ping", "t0": time.monotonic()}))
+            await asyncio.sleep(interval)
+
+    def _update_clock(self, pong):
+        t3 = time.monotonic()
+        rtt = (t3 - pong["t0"]) - (pong["t2"] - pong["t1"])
+        offset = ((pong["t1"] - pong["t0"]) + (pong["t2"] - t3)) / 2
+        # The sample with the lowest round trip has the least queueing error
+        self.clock_samples = (self.clock_samples + [(rtt, offset)])[-8:]
+        self.clock_offset = min(self.clock_samples)[1]
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    parser = argparse.ArgumentParser(description="Fan out a tracking backend to many display clients.")
+    parser.add_argument("--upstream", default="ws://localhost:8765",
+                        help="Backend or relay to subscribe to")
+    parser.add_argument("--host", default="0.0.0.0", help="Interface to serve downstream clients on")
+    parser.add_argument("--port", type=int, default=8766, help="Port to serve downstream clients on")
+    args = parser.parse_args()
+
+    relay = Relay(args.upstream, host=args.host, port=args.port)
+    try:
+        asyncio.run(relay.run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,147 @@
+"""
+On-demand sampling profiler for the running backend.
+
+While active, a background thread snapshots the Python stacks of the
+interesting threads (the asyncio loop on MainThread, PoseTracker,
+HandTracker, AIVisualGenerator) with sys._current_frames() at a fixed rate,
+and when the session ends writes them in collapsed-stack format
+("thread;outer;...;inner count" per line), ready for flamegraph.pl or
+speedscope. Nothing runs while it is off.
+
+Toggle it in main.py with `kill -USR1 <pid>` or a WebSocket control message:
+    {"type": "profile", "action": "start", "rate": 100, "duration": 10}
+    {"type": "profile", "action": "stop"}
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import logging
+import log_setup
+from collections import Counter
+
+logger = logging.getLogger("SamplingProfiler")
+
+DEFAULT_THREADS = ("MainThread", "PoseTracker", "HandTracker", "AIVisualGenerator")
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir="profiles", threads=DEFAULT_THREADS, max_rate=500.0, max_duration=120.0):
+        self.output_dir = output_dir
+        self.threads = threads  # Thread names to sample, or None for every thread
+        self.max_rate = max_rate  # Caps keep the cost bounded whatever a client asks for
+        self.max_duration = max_duration
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.last_output = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, rate=100.0, duration=10.0):
+        """Starts a session in the background; returns False if one is already running."""
+        if self.running:
+            return False
+        rate = min(max(float(rate), 1.0), self.max_rate)
+        duration = min(max(float(duration), 0.1), self.max_duration)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, args=(rate, duration), name="SamplingProfiler")
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"Profiling {', '.join(self.threads or ['all threads'])} at {rate:.0f} Hz for {duration:.1f}s")
+        return True
+
+    def stop(self):
+        """Ends the current session early; its samples are still written."""
+        self.stop_event.set()
+
+    def toggle(self):
+        """Signal handler entry point: starts a default session, or stops the running one."""
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    async def handle_control(self, websocket, data):
+        """WebSocketServer control handler for {"type": "profile", ...} messages."""
+        action = data.get("action", "start")
+        if action == "start":
+            self.start(data.get("rate", 100.0), data.get("duration", 10.0))
+        elif action == "stop":
+            self.stop()
+        await websocket.send(json.dumps({"type": "profile", "running": self.running, "last_output": self.last_output}))
+
+    def _run(self, rate, duration):
+        interval = 1.0 / rate
+        stacks = Counter()
+        samples = 0
+        own_ident = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + duration
+        next_sample = start
+
+        while not self.stop_event.is_set() and time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, f"thread-{ident}")
+                if ident == own_ident or (self.threads and name not in self.threads):
+                    continue
+                stacks[self._collapse(name, frame)] += 1
+            samples += 1
+            frame = None  # Don't keep the last sampled frame (and its locals) alive while sleeping
+
+            # Fixed schedule; if sampling itself overran, skip ahead instead of bursting
+            next_sample += interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            else:
+                next_sample = time.perf_counter()
+
+        elapsed = time.perf_counter() - start
+        self.last_output = self._write(stacks)
+        self._log_summary(stacks, samples, elapsed)
+
+    @staticmethod
+    def _collapse(thread_name, frame):
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+            frame = frame.f_back
+        parts.append(thread_name)
+        return ";".join(reversed(parts))
+
+    def _write(self, stacks):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def _log_summary(self, stacks, samples, elapsed):
+        per_thread = Counter()
+        for stack, count in stacks.items():
+            per_thread[stack.split(";", 1)[0]] += count
+        logger.info(f"Profile written to {self.last_output}: {samples} samples in {elapsed:.1f}s "
+                    f"({samples / max(elapsed, 1e-6):.0f} Hz)")
+        for name, count in per_thread.most_common():
+            logger.info(f"  {name}: {count} stack samples")
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    # Profile a busy worker thread for two seconds
+    def busy():
+        while True:
+            sum(i * i for i in range(10000))
+            time.sleep(0.001)
+
+    threading.Thread(target=busy, name="PoseTracker", daemon=True).start()
+    profiler = SamplingProfiler(output_dir="profiles")
+    profiler.start(rate=200, duration=2)
+    profiler.thread.join()
@@ -0,0 +1,108 @@
+"""
+Turns a pose segmentation mask into a compact silhouette for the web client.
+
+The mask (a float image the size of the camera frame) is never sent. It is
+thresholded, its outer contours are simplified with Douglas-Peucker until
+they fit a point budget, and the points are quantized to uint16 and packed
+into a small binary blob (base64 in the JSON message), typically a few
+hundred bytes.
+
+Blob layout (little-endian uint16):
+    contour_count, then per contour: point_count, x0, y0, x1, y1, ...
+with x/y normalized to [0, 65535] over the frame width/height.
+"""
+
+import base64
+import logging
+import log_setup
+import time
+import cv2
+import numpy as np
+
+logger = logging.getLogger("Silhouette")
+
+QUANT_MAX = 65535
+
+
+def encode_contours(contours):
+    """Packs a list of (N, 2) normalized point arrays into the blob format above."""
+    parts = [np.array([len(contours)], dtype="<u2")]
+    for points in contours:
+        quantized = np.clip(np.round(points * QUANT_MAX), 0, QUANT_MAX).astype("<u2")
+        parts.append(np.array([len(quantized)], dtype="<u2"))
+        parts.append(quantized.ravel())
+    return base64.b64encode(np.concatenate(parts).tobytes()).decode("ascii")
+
+
+def decode_contours(blob):
+    """Inverse of encode_contours(); returns a list of (N, 2) float arrays."""
+    data = np.frombuffer(base64.b64decode(blob), dtype="<u2")
+    contours = []
+    offset = 1
+    for _ in range(int(data[0])):
+        count = int(data[offset])
+        points = data[offset + 1:offset + 1 + 2 * count].reshape(count, 2)
+        contours.append(points.astype(np.float32) / QUANT_MAX)
+        offset += 1 + 2 * count
+    return contours
+
+
+class SilhouetteExtractor:
+    def __init__(self, max_points=200, max_contours=3, min_area=0.002, threshold=0.5, work_width=256):
+        self.max_points = max_points  # Point budget over all contours of a frame
+        self.max_contours = max_contours
+        self.min_area = min_area  # Fraction of the frame; smaller blobs are noise
+        self.threshold = threshold
+        self.work_width = work_width  # Masks are downscaled to this width before tracing
+
+    def extract(self, mask, capture_time):
+        """
+        mask: (H, W) or (H, W, 1) float array in [0, 1].
+        Returns {"capture_time", "points", "contours": blob}; "contours" is
+        an empty blob when nobody is in frame.
+        """
+        mask = np.asarray(mask, dtype=np.float32)
+        if mask.ndim == 3:
+            mask = mask[:, :, 0]
+        height, width = mask.shape
+        if width > self.work_width:
+            height = max(1, round(height * self.work_width / width))
+            width = self.work_width
+            mask = cv2.resize(mask, (width, height), interpolation=cv2.INTER_AREA)
+        binary = (mask > self.threshold).astype(np.uint8)
+
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        min_area = self.min_area * width * height
+        contours = sorted((c for c in contours if cv2.contourArea(c) >= min_area),
+                          key=cv2.contourArea, reverse=True)[:self.max_contours]
+
+        polylines = self._simplify(contours)
+        scale = np.array([width, height], dtype=np.float32)
+        normalized = [polyline.reshape(-1, 2).astype(np.float32) / scale for polyline in polylines]
+        return {
+            "capture_time": capture_time,
+            "points": sum(len(points) for points in normalized),
+            "contours": encode_contours(normalized),
+        }
+
+    def _simplify(self, contours):
+        # Start at ~0.5% of each perimeter and coarsen until everything fits the budget
+        tolerance = 0.005
+        while True:
+            polylines = [cv2.approxPolyDP(c, tolerance * cv2.arcLength(c, True), True) for c in contours]
+            if sum(len(p) for p in polylines) <= self.max_points or tolerance > 0.1:
+                return polylines
+            tolerance *= 1.5
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    # Quick size check on a synthetic mask
+    mask = np.zeros((480, 640), dtype=np.float32)
+    cv2.ellipse(mask, (320, 260), (90, 200), 0, 0, 360, 1.0, -1)
+    cv2.circle(mask, (320, 60), 45, 1.0, -1)
+    start = time.perf_counter()
+    silhouette = SilhouetteExtractor().extract(mask, time.monotonic())
+    elapsed = (time.perf_counter() - start) * 1000
+    logger.info(f"{silhouette['points']} points, {len(silhouette['contours'])} bytes (base64) in {elapsed:.2f} ms "
+                f"vs {mask.size} mask pixels")
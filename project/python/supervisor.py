@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("Supervisor")
+
+
+class WatchedComponent:
+    def __init__(self, name, component, stall_timeout):
+        self.name = name
+        self.component = component
+        self.stall_timeout = stall_timeout
+        self.restarts = 0
+        self.backoff = 0.0  # Grows while restarts keep failing (e.g. camera unplugged)
+        self.next_attempt = 0.0
+        self.healthy = True
+
+
+class Supervisor:
+    """
+    Watches background components (trackers, generator) from the asyncio loop
+    and restarts them when their thread dies or their heartbeat goes stale.
+
+    A watched component provides:
+      - is_alive() -> bool
+      - last_heartbeat: time.time() of its last processed unit of work
+      - restart(): starts a fresh worker (may block; runs in an executor)
+    """
+
+    def __init__(self, server=None, check_interval=0.1, max_backoff=5.0):
+        self.server = server
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.watched = []
+        self.baseline_status = None  # Server status before the current incident, restored on recovery
+
+    def watch(self, name, component, stall_timeout):
+        self.watched.append(WatchedComponent(name, component, stall_timeout))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = time.time()
+            for entry in self.watched:
+                problem = self._check(entry, now)
+                if problem is None:
+                    if not entry.healthy:
+                        entry.healthy = True
+                        entry.backoff = 0.0
+                        await self._recovered(entry)
+                    continue
+
+                if now < entry.next_attempt:
+                    continue
+
+                if self.server and all(e.healthy for e in self.watched):
+                    self.baseline_status = self.server.status_payload
+                entry.healthy = False
+                entry.restarts += 1
+                logger.warning(f"{entry.name} {problem}; restarting (attempt {entry.restarts})")
+                await self._report(f"{entry.name} {problem}, restarting", entry, "restarting")
+                try:
+                    await loop.run_in_executor(None, entry.component.restart)
+                except Exception as e:
+                    logger.error(f"Restarting {entry.name} failed: {e}")
+
+                # Give the new worker one stall period to produce output,
+                # and back off further only if the component keeps failing
+                entry.backoff = min(max(entry.backoff * 2, self.check_interval), self.max_backoff)
+                entry.next_attempt = time.time() + max(entry.stall_timeout, entry.backoff)
+
+            await asyncio.sleep(self.check_interval)
+
+    def _check(self, entry, now):
+        """Returns a short description of what is wrong, or None if healthy."""
+        component = entry.component
+        if not component.is_alive():
+            return "thread stopped"
+        age = now - component.last_heartbeat
+        if age > entry.stall_timeout:
+            return f"stalled for {age:.1f}s"
+        return None
+
+    async def _report(self, message, entry, state, sticky=True):
+        if self.server:
+            # Recovery happens live, so the show stays "ready" while it does
+            await self.server.set_status(message, ready=True, sticky=sticky, component=entry.name,
+                                         state=state, restarts=entry.restarts)
+
+    async def _recovered(self, entry):
+        # Announced once; clients connecting later get the status from before the incident
+        await self._report(f"{entry.name} recovered", entry, "ok", sticky=False)
+        if self.server and all(e.healthy for e in self.watched):
+            self.server.status_payload = self.baseline_status
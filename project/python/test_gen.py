@@ -1,5 +1,6 @@
 import time
 import os
+import log_setup
 from ai_visual_generation import AIVisualGenerator
 
 def test_generation():
@@ -29,4 +30,5 @@ def test_generation():
     print("Done.")
 
 if __name__ == "__main__":
+    log_setup.configure()
     test_generation()
@@ -0,0 +1,44 @@
+import tempfile
+import log_setup
+from landmark_history import LandmarkHistory, LandmarkHistoryWriter, KEYPOINTS
+
+def write_two_people(directory, frames=100, fps=30.0):
+    """Person 0 (with a "heart" right hand) on the left, person 1 on the right, same timestamps."""
+    writer = LandmarkHistoryWriter(directory, flush_interval=0.05)
+    writer.start()
+    start = 1000.0
+    for i in range(frames):
+        t = start + i / fps
+        left = {"timestamp": t, **{name: [0.25, 0.5] for name in KEYPOINTS}}
+        right = {"timestamp": t, **{name: [0.75, 0.5] for name in KEYPOINTS}}
+        hands = {"hands": [{"hand": "Right", "gesture": "heart", "index_tip": [0.3, 0.4]}]}
+        writer.append(left, hands, person=0)
+        writer.append(right, None, person=1)
+    writer.stop()
+    return (frames - 1) / fps
+
+def test_multi_person_queries():
+    with tempfile.TemporaryDirectory() as directory:
+        duration = write_two_people(directory)
+        history = LandmarkHistory(directory)
+
+        # Each person's dwell is timed on their own records, not the interleaved stream
+        left_half, right_half = (0.0, 0.0, 0.5, 1.0), (0.5, 0.0, 1.0, 1.0)
+        assert abs(history.dwell_seconds("nose", left_half, person=0) - duration) < 1e-3
+        assert abs(history.dwell_seconds("nose", right_half, person=1) - duration) < 1e-3
+        assert history.dwell_seconds("nose", right_half, person=0) == 0.0
+        assert abs(history.dwell_seconds("nose", (0, 0, 1, 1)) - 2 * duration) < 1e-3
+
+        # Hands are only logged with the primary person
+        assert history.gesture_counts("Right") == {"heart": 100}
+
+        assert len(history.positions("nose")) == 200
+        points = history.positions("nose", person=1)
+        assert len(points) == 100 and (points[:, 0] == 0.75).all()
+        assert history.histogram2d("nose", bins=2, person=0)[0].sum() == 100
+        assert history.histogram2d("nose", bins=2, person=0)[1].sum() == 0
+
+if __name__ == "__main__":
+    log_setup.configure()
+    test_multi_person_queries()
+    print("OK")
@@ -2,6 +2,12 @@ import time
 import math
 
 class VisualLogic:
+    # Prompt for each texture type the gestures can trigger (prefix -> prompt).
+    # The AI generator keeps a pre-warmed pool for each of these.
+    TEXTURE_PROMPTS = {
+        "rune": "glowing magical rune symbol, cyan and purple, black background, 8k",
+    }
+
     def __init__(self):
         self.last_pose = None
         self.last_trigger_time = 0
@@ -72,7 +78,7 @@ class VisualLogic:
                 commands.append({
                     "command": "generate_texture",
                     "params": {
-                        "prompt": "glowing magical rune symbol, cyan and purple, black background, 8k",
+                        "prompt": self.TEXTURE_PROMPTS["rune"],
                         "type": "rune"
                     }
                 })
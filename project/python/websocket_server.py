@@ -1,45 +1,291 @@
 import asyncio
+import time
 import websockets
 import json
 import logging
+import log_setup
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("WebSocketServer")
 
+# Topics a client can subscribe to. State topics only ever need the latest
+# value, so they are rate-limited per client; event topics are always delivered.
+STATE_TOPICS = ("pose", "hands", "silhouette", "stats")
+EVENT_TOPICS = ("commands", "textures")
+TOPICS = STATE_TOPICS + EVENT_TOPICS
+
+# Topics whose rate follows the client's reported render speed (see ClientState.report)
+ADAPTIVE_TOPICS = ("pose", "hands", "silhouette")
+# Adaptive rates snap to these steps, so clients on similar machines share slots and payloads
+ADAPTIVE_RATES = (30, 20, 15, 10, 5)
+HANDLE_BUDGET = 0.2  # Max fraction of a client's time spent handling our messages
+
+class ClientState:
+    def __init__(self):
+        self.topics = set(TOPICS)  # Everything by default, so plain clients keep working
+        self.rates = {}  # topic -> max updates per second (missing = every update)
+        self.last_slot = {}  # topic -> rate slot of the last update sent
+        # Set from {"type": "client_stats"} reports; clients that never report get everything
+        self.fps = None  # Smoothed render FPS
+        self.auto_rate = None  # Cap on ADAPTIVE_TOPICS (None = every update)
+        self.detail = "full"  # "reduced": rounded coordinates, no extra people/confidences
+        self.sending = None  # Task writing the last update; the client is skipped while it runs
+        self.skipped = 0
+
+    def report(self, fps, handle_ms):
+        """
+        Adapts to a client's measured render FPS and per-message handling
+        time: no more updates than it draws frames, no more than fit in
+        HANDLE_BUDGET of its time, and a lighter payload below 30 fps.
+        """
+        self.fps = fps if self.fps is None else 0.7 * self.fps + 0.3 * fps
+        target = self.fps
+        if handle_ms > 0:
+            target = min(target, HANDLE_BUDGET * 1000.0 / handle_ms)
+        # Full rate when it keeps up (with some headroom below 60 fps); else the nearest step below
+        if target >= 50:
+            self.auto_rate = None
+        else:
+            self.auto_rate = next((rate for rate in ADAPTIVE_RATES if rate <= target), ADAPTIVE_RATES[-1])
+        self.detail = "full" if self.fps >= 30 else "reduced"
+
+    def wants_everything(self):
+        """True while this client takes every update as published: all topics, full rate and detail."""
+        return self.topics == set(TOPICS) and not any(self.rates.values()) \
+            and self.auto_rate is None and self.detail == "full"
+
+    def is_due(self, topic, now):
+        """
+        Rate limiting uses fixed time slots (int(now * rate)), so all clients
+        asking for the same rate become due on the same tick and can share
+        one encoded payload.
+        """
+        rate = self.rates.get(topic)
+        if self.auto_rate and topic in ADAPTIVE_TOPICS:
+            rate = min(rate, self.auto_rate) if rate else self.auto_rate
+        if not rate:
+            return True
+        slot = int(now * rate)
+        if self.last_slot.get(topic) == slot:
+            return False
+        self.last_slot[topic] = slot
+        return True
+
+def reduce_detail(topic, value):
+    """Lighter copy of a state value for weak clients: 3-decimal coordinates, only what the visuals draw."""
+    if topic == "pose":
+        return {key: [round(item[0], 3), round(item[1], 3)] if isinstance(item, list) and len(item) == 2 else item
+                for key, item in value.items() if key not in ("people", "score", "cameras")}
+    if topic == "hands":
+        return dict(value, hands=[{"hand": hand["hand"], "gesture": hand["gesture"],
+                                   "index_tip": [round(hand["index_tip"][0], 3), round(hand["index_tip"][1], 3)]}
+                                  for hand in value.get("hands", [])])
+    return value
+
+def _ignore_send_error(task):
+    if not task.cancelled():
+        task.exception()  # Retrieved so a closed connection isn't logged as an unhandled error
+
 class WebSocketServer:
-    def __init__(self, host="localhost", port=8765):
+    """
+    Control messages a client can send:
+      {"type": "subscribe", "topics": ["pose", "commands"], "rates": {"pose": 5}}
+      {"type": "snapshot"}  -> replies with the latest state of every topic
+      {"type": "ping", "t0": ...}  -> {"type": "pong", "t0", "t1", "t2"} (NTP-style clock sync)
+      {"type": "client_stats", "fps": 42, "handle_ms": 1.5}  -> adapts this client's rate and detail,
+          replying {"type": "adapt", "rate", "detail"} when they change
+    Other modules can add message types with add_control_handler(); other
+    types go to `default_handler` if set (a relay forwards them upstream).
+    """
+
+    def __init__(self, host="localhost", port=8765, clock=time.monotonic):
         self.host = host
         self.port = port
-        self.clients = set()
+        self.clock = clock  # Timebase of capture_time fields, reported in pongs
+        self.clients = {}  # websocket -> ClientState
+        self.status_payload = None  # Last encoded status message, replayed to clients that connect later
+        self.latest = {}  # topic -> latest state value, for snapshots
+        self.last_texture = None
+        self.control_handlers = {
+            "subscribe": self._handle_subscribe,
+            "snapshot": self._handle_snapshot,
+            "ping": self._handle_ping,
+            "client_stats": self._handle_client_stats,
+        }
+        self.default_handler = None  # async callable(websocket, message) for unknown types
+
+    def add_control_handler(self, message_type, handler):
+        """handler: async callable(websocket, message) for client messages of this type."""
+        self.control_handlers[message_type] = handler
 
     async def register(self, websocket):
-        self.clients.add(websocket)
+        self.clients[websocket] = ClientState()
         logger.info(f"Client connected. Total clients: {len(self.clients)}")
+        if self.status_payload:
+            await websocket.send(self.status_payload)
+
+    async def set_status(self, message, ready=False, sticky=True, **details):
+        """
+        Broadcasts a status message (e.g. warm-up progress). Sticky ones are
+        remembered and replayed to clients that connect later.
+        """
+        payload = json.dumps({"type": "status", "message": message, "ready": ready, **details})
+        if sticky:
+            self.status_payload = payload
+        logger.info(f"Status: {message}")
+        await self.broadcast_raw(payload)
 
     async def unregister(self, websocket):
-        self.clients.remove(websocket)
+        self.clients.pop(websocket, None)
         logger.info(f"Client disconnected. Total clients: {len(self.clients)}")
 
     async def handler(self, websocket):
         await self.register(websocket)
         try:
             async for message in websocket:
-                # Handle incoming messages from client if needed
-                # For now, we mostly push data TO the client
-                pass
+                await self._handle_control(websocket, message)
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
             await self.unregister(websocket)
 
+    async def _handle_control(self, websocket, message):
+        try:
+            data = json.loads(message)
+            handler = self.control_handlers.get(data.get("type"), self.default_handler)
+        except (ValueError, AttributeError):
+            logger.warning("Ignoring malformed client message")
+            return
+        if handler:
+            try:
+                await handler(websocket, data)
+            except Exception as e:
+                logger.warning(f"Error handling {data.get('type')} message: {e}")
+
+    async def _handle_subscribe(self, websocket, data):
+        state = self.clients[websocket]
+        if "topics" in data:
+            state.topics = set(data["topics"]) & set(TOPICS)
+        for topic, rate in data.get("rates", {}).items():
+            if topic in STATE_TOPICS:
+                state.rates[topic] = float(rate) if rate else None
+        logger.info(f"Client subscribed to {sorted(state.topics)} at {state.rates}")
+
+    async def _handle_snapshot(self, websocket, data):
+        state = self.clients[websocket]
+        snapshot = {"type": "snapshot"}
+        for topic in STATE_TOPICS:
+            if topic in state.topics:
+                snapshot[topic] = self.latest.get(topic)
+        if "textures" in state.topics:
+            snapshot["texture"] = self.last_texture
+        await websocket.send(json.dumps(snapshot))
+
+    async def _handle_ping(self, websocket, data):
+        # t1/t2 bracket the server side so the client can subtract our processing time
+        t1 = self.clock()
+        pong = {"type": "pong", "t0": data.get("t0"), "t1": t1}
+        pong["t2"] = self.clock()
+        await websocket.send(json.dumps(pong))
+
+    async def _handle_client_stats(self, websocket, data):
+        state = self.clients[websocket]
+        previous = (state.auto_rate, state.detail)
+        state.report(float(data["fps"]), float(data.get("handle_ms", 0.0)))
+        if (state.auto_rate, state.detail) != previous:
+            logger.info(f"Client at {state.fps:.0f} fps: rate {state.auto_rate or 'full'}, {state.detail} detail")
+            # Lets the client match its interpolation delay to the new rate
+            await websocket.send(json.dumps({"type": "adapt", "rate": state.auto_rate, "detail": state.detail}))
+
+    def client_summary(self):
+        """Per-client adaptation, for the stats topic."""
+        return [{"fps": state.fps and round(state.fps, 1), "rate": state.auto_rate, "detail": state.detail,
+                 "skipped": state.skipped} for state in self.clients.values()]
+
+    async def publish(self, message_type, values, clients=None):
+        """
+        Sends one tick of topic values, e.g. publish("update", {"pose": ..., "hands": ..., "commands": [...]}),
+        to every client or just `clients`.
+
+        Each client gets a `message_type` message with just the topics it
+        subscribed to and that are due at its rate. Payloads are encoded once
+        per distinct (due topics, detail level), not once per client.
+
+        Sends are not awaited: a client still writing its previous update is
+        skipped for state-only ticks, so one slow reader can't hold up the loop
+        or everyone else.
+        """
+        for topic, value in values.items():
+            if topic in STATE_TOPICS and value is not None:
+                self.latest[topic] = value
+        if clients is None:
+            clients = list(self.clients)
+        if not clients:
+            return
+
+        now = time.time()
+        payloads = {}  # (due topics, detail) -> encoded payload
+        reduced = {}  # topic -> reduced value, built on first use
+        for client in clients:
+            state = self.clients.get(client)
+            if state is None:
+                continue
+            busy = state.sending is not None and not state.sending.done()
+            due = tuple(
+                topic for topic, value in values.items()
+                if topic in state.topics and value is not None
+                and (topic in EVENT_TOPICS and value or topic in STATE_TOPICS and not busy and state.is_due(topic, now))
+            )
+            if not due:
+                if busy:
+                    state.skipped += 1
+                continue
+            key = (due, state.detail)
+            if key not in payloads:
+                message = {"type": message_type}
+                for topic in due:
+                    if state.detail == "reduced" and topic in ADAPTIVE_TOPICS:
+                        if topic not in reduced:
+                            reduced[topic] = reduce_detail(topic, values[topic])
+                        message[topic] = reduced[topic]
+                    else:
+                        message[topic] = values[topic]
+                payloads[key] = json.dumps(message)
+            self._send(client, state, payloads[key])
+
+    def _send(self, client, state, payload):
+        """Queues a send without waiting for it; state.sending tracks the client's latest write."""
+        state.sending = asyncio.create_task(client.send(payload))
+        state.sending.add_done_callback(_ignore_send_error)
+
+    async def publish_event(self, topic, message):
+        """Sends a standalone event message (e.g. texture_ready) to the clients subscribed to `topic`."""
+        if topic == "textures":
+            self.last_texture = message
+        payload = json.dumps(message)
+        for client, state in self.clients.items():
+            if topic in state.topics:
+                self._send(client, state, payload)
+
     async def broadcast(self, message):
         if not self.clients:
             return
-        
-        # Create a list of tasks to send the message to all clients
-        tasks = [asyncio.create_task(client.send(json.dumps(message))) for client in self.clients]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        # Serialize once, not once per client
+        await self.broadcast_raw(json.dumps(message))
+
+    async def broadcast_raw(self, payload, droppable=False, clients=None):
+        """
+        Sends an already-encoded frame (str or bytes) as-is to every client (or
+        just `clients`), without waiting on slow ones. A droppable frame (latest
+        state only) skips clients still writing their previous frame, as publish() does.
+        """
+        for client in list(self.clients) if clients is None else clients:
+            state = self.clients.get(client)
+            if state is None:
+                continue
+            if droppable and state.sending is not None and not state.sending.done():
+                state.skipped += 1
+                continue
+            self._send(client, state, payload)
 
     async def start(self):
         logger.info(f"Starting WebSocket server on ws://{self.host}:{self.port}")
@@ -47,5 +293,6 @@ class WebSocketServer:
             await asyncio.Future()  # run forever
 
 if __name__ == "__main__":
+    log_setup.configure()
     server = WebSocketServer()
     asyncio.run(server.start())
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Fan-out load test for WebSocketServer.
+
+Starts a WebSocketServer in this process and drives it the way main.py
+does (publish("update", ...) at a fixed rate), while N simulated display
+clients connect from worker processes. Some clients can be slow readers and
+clients can be disconnected/reconnected continuously (churn).
+
+Reports the achieved publish rate, how long each publish held up the loop,
+per-client delivery latency percentiles (capture_time -> client receive,
+both on the host's monotonic clock), server memory growth and server CPU
+per client, as JSON so runs before/after a server change can be diffed.
+
+Usage:
+    python ws_benchmark.py --clients 50 --duration 20
+    python ws_benchmark.py --clients 200 --slow 10 --slow-delay 0.05 --churn 5 --output bench.json
+    python ws_benchmark.py --clients 20 --replay history   # replay recorded poses (landmark_history.py)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import log_setup
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import numpy as np
+import websockets
+from websocket_server import WebSocketServer
+
+logger = logging.getLogger("WSBenchmark")
+
+
+# --- Pose sources ---------------------------------------------------------
+
+def synthetic_poses():
+    """Endless stream of plausible keypoint dicts (a person swaying and waving)."""
+    frame = 0
+    while True:
+        t = frame / 30.0
+        sway = 0.05 * math.sin(t)
+        wave = 0.15 * math.sin(t * 3)
+        yield {
+            "nose": [0.5 + sway, 0.25],
+            "left_wrist": [0.3 + sway, 0.5 + wave],
+            "right_wrist": [0.7 + sway, 0.5 - wave],
+            "left_index": [0.28 + sway, 0.48 + wave],
+            "right_index": [0.72 + sway, 0.48 - wave],
+            "left_shoulder": [0.4 + sway, 0.4],
+            "right_shoulder": [0.6 + sway, 0.4],
+        }
+        frame += 1
+
+
+def replayed_poses(directory):
+    """Loops over the poses recorded by LandmarkHistoryWriter."""
+    from landmark_history import LandmarkHistory, KEYPOINTS
+    chunks = list(LandmarkHistory(directory).query())
+    records = np.concatenate(chunks) if chunks else None
+    if records is None or len(records) == 0:
+        raise SystemExit(f"No landmark history found in {directory}")
+    logger.info(f"Replaying {len(records)} recorded poses from {directory}")
+    while True:
+        for landmarks in records["landmarks"]:
+            yield {name: [float(x), float(y)] for name, (x, y) in zip(KEYPOINTS, landmarks)}
+
+
+# --- Client side (worker processes) ---------------------------------------
+
+async def _client(url, slow_delay, subscribe, latencies, counters):
+    async with websockets.connect(url) as ws:
+        if subscribe:
+            await ws.send(json.dumps(subscribe))
+        async for message in ws:
+            received = time.monotonic()
+            data = json.loads(message)
+            pose = data.get("pose")
+            if pose and "capture_time" in pose:
+                latencies.append(received - pose["capture_time"])
+                counters["received"] += 1
+            if slow_delay:
+                await asyncio.sleep(slow_delay)  # Simulates a display that can't keep up
+
+
+async def _run_clients(url, count, slow_count, slow_delay, churn, stop, subscribe):
+    latencies = []
+    counters = {"received": 0, "reconnects": 0, "errors": 0}
+
+    async def keep_connected(index):
+        delay = slow_delay if index < slow_count else 0.0
+        try:
+            await _client(url, delay, subscribe, latencies, counters)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            counters["errors"] += 1
+
+    tasks = [asyncio.create_task(keep_connected(i)) for i in range(count)]
+    while not stop.is_set():
+        if churn and tasks:
+            # Drop a random client and connect a replacement, `churn` times per second overall
+            await asyncio.sleep(random.expovariate(churn))
+            index = random.randrange(len(tasks))
+            tasks[index].cancel()
+            tasks[index] = asyncio.create_task(keep_connected(index))
+            counters["reconnects"] += 1
+        else:
+            await asyncio.sleep(0.1)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return latencies, counters
+
+
+def client_worker(url, count, slow_count, slow_delay, churn, stop, subscribe, results):
+    latencies, counters = asyncio.run(
+        _run_clients(url, count, slow_count, slow_delay, churn, stop, subscribe))
+    results.put((np.array(latencies, dtype=np.float32), counters))
+
+
+# --- Server side -----------------------------------------------------------
+
+def rss_mb():
+    """Current resident memory of this process (peak RSS where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def percentiles(values, points=(50, 90, 99, 99.9)):
+    if len(values) == 0:
+        return None
+    result = {f"p{p:g}": float(np.percentile(values, p)) * 1000 for p in points}
+    result["max"] = float(np.max(values)) * 1000
+    return result
+
+
+async def drive(server, poses, rate, duration):
+    """Publishes poses like main.py's loop; returns per-tick publish durations and elapsed seconds."""
+    interval = 1.0 / rate
+    publish_times = []
+    start = time.monotonic()
+    next_tick = start
+    while time.monotonic() - start < duration:
+        pose = dict(next(poses), timestamp=time.time(), capture_time=time.monotonic())
+        hands = {"timestamp": pose["timestamp"], "capture_time": pose["capture_time"], "hands": []}
+        publish_start = time.perf_counter()
+        await server.publish("update", {"pose": pose, "hands": hands, "commands": []})
+        publish_times.append(time.perf_counter() - publish_start)
+
+        next_tick += interval
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            next_tick = time.monotonic()  # Fell behind: don't try to catch up with a burst
+    return np.array(publish_times), time.monotonic() - start
+
+
+async def run_benchmark(args):
+    server = WebSocketServer(host="127.0.0.1", port=args.port)
+    server_task = asyncio.create_task(server.start())
+    await asyncio.sleep(0.5)
+    url = f"ws://127.0.0.1:{args.port}"
+
+    subscribe = None
+    if args.pose_rate:
+        subscribe = {"type": "subscribe", "topics": ["pose"], "rates": {"pose": args.pose_rate}}
+
+    # Spread clients (and slow readers) evenly over the worker processes
+    processes = max(1, args.processes)
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    stop = ctx.Event()  # Set once the measurement is over
+    workers = []
+    for i in range(processes):
+        count = args.clients // processes + (1 if i < args.clients % processes else 0)
+        slow = args.slow // processes + (1 if i < args.slow % processes else 0)
+        worker = ctx.Process(target=client_worker, daemon=True,
+                             args=(url, count, slow, args.slow_delay, args.churn / processes,
+                                   stop, subscribe, results))
+        worker.start()
+        workers.append(worker)
+
+    # Let everyone connect before measuring
+    poses = replayed_poses(args.replay) if args.replay else synthetic_poses()
+    connect_deadline = time.monotonic() + args.warmup
+    while len(server.clients) < args.clients and time.monotonic() < connect_deadline:
+        await asyncio.sleep(0.05)
+    connected_at_start = len(server.clients)
+    logger.info(f"{connected_at_start}/{args.clients} clients connected; driving at {args.rate} Hz "
+                f"for {args.duration}s")
+
+    rss_start = rss_mb()
+    cpu_start = time.process_time()
+    publish_times, elapsed = await drive(server, poses, args.rate, args.duration)
+    cpu_seconds = time.process_time() - cpu_start
+    rss_end = rss_mb()
+    connected_at_end = len(server.clients)
+    stop.set()
+
+    latencies, counters = [], {"received": 0, "reconnects": 0, "errors": 0}
+    for _ in workers:
+        worker_latencies, worker_counters = await asyncio.get_running_loop().run_in_executor(None, results.get)
+        latencies.append(worker_latencies)
+        for key, value in worker_counters.items():
+            counters[key] += value
+    for worker in workers:
+        worker.join(timeout=5)
+    server_task.cancel()
+
+    latencies = np.concatenate(latencies) if latencies else np.array([])
+    ticks = len(publish_times)
+    return {
+        "config": vars(args),
+        "host": {"python": platform.python_version(), "platform": platform.platform(),
+                 "cpus": os.cpu_count()},
+        "timestamp": time.time(),
+        "clients_connected": {"start": connected_at_start, "end": connected_at_end},
+        "broadcast": {
+            "target_hz": args.rate,
+            "achieved_hz": ticks / elapsed,
+            "ticks": ticks,
+            # Time each publish() held up the main loop; over 1/rate means the loop slipped
+            "publish_ms": percentiles(publish_times),
+            "slipped_ticks": int(np.sum(publish_times > 1.0 / args.rate)),
+        },
+        "delivery": {
+            "messages": counters["received"],
+            "per_client_hz": counters["received"] / max(1, args.clients) / elapsed,
+            "latency_ms": percentiles(latencies),
+            "reconnects": counters["reconnects"],
+            "client_errors": counters["errors"],
+        },
+        "server": {
+            "rss_start_mb": rss_start,
+            "rss_end_mb": rss_end,
+            "rss_growth_mb": rss_end - rss_start,
+            "cpu_percent": 100 * cpu_seconds / elapsed,
+            "cpu_ms_per_client_per_s": 1000 * cpu_seconds / elapsed / max(1, args.clients),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test WebSocketServer fan-out.")
+    parser.add_argument("--clients", type=int, default=50, help="Simulated display clients")
+    parser.add_argument("--processes", type=int, default=2, help="Worker processes hosting the clients")
+    parser.add_argument("--slow", type=int, default=0, help="How many clients are slow readers")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="Seconds a slow reader spends per message")
+    parser.add_argument("--churn", type=float, default=0.0, help="Client disconnects/reconnects per second")
+    parser.add_argument("--rate", type=float, default=60.0, help="Publish rate (main.py runs at ~60 Hz)")
+    parser.add_argument("--pose-rate", type=float, default=0.0, help="Per-client pose rate cap (0 = every update)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Max seconds to wait for clients to connect")
+    parser.add_argument("--replay", help="Landmark history directory to replay instead of synthetic poses")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--output", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        logger.info(f"Report written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    log_setup.configure()
+    main()
@@ -0,0 +1,94 @@
+/**
+ * NTP-style clock sync with the backend.
+ * The server answers {type:'ping', t0} with {type:'pong', t0, t1, t2}, where
+ * t1/t2 are its monotonic clock (the same clock as `capture_time` in updates).
+ */
+export class ClockSync {
+    constructor() {
+        this.samples = []; // Recent {rtt, offset} pairs
+        this.offset = null; // server clock - local clock (seconds)
+        this.rtt = null;
+    }
+
+    static localNow() {
+        return performance.now() / 1000;
+    }
+
+    ping(socket) {
+        if (socket.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify({ type: 'ping', t0: ClockSync.localNow() }));
+        }
+    }
+
+    handlePong(msg) {
+        const t3 = ClockSync.localNow();
+        const rtt = (t3 - msg.t0) - (msg.t2 - msg.t1);
+        const offset = ((msg.t1 - msg.t0) + (msg.t2 - t3)) / 2;
+
+        this.samples.push({ rtt, offset });
+        if (this.samples.length > 8) this.samples.shift();
+
+        // The sample with the lowest round trip has the least queueing error
+        const best = this.samples.reduce((a, b) => (b.rtt < a.rtt ? b : a));
+        this.offset = best.offset;
+        this.rtt = best.rtt;
+    }
+
+    isSynced() {
+        return this.offset !== null;
+    }
+
+    serverNow() {
+        return ClockSync.localNow() + this.offset;
+    }
+}
+
+// The [x, y] keypoints of a pose (backend pose_tracking.KEYPOINTS). Other fields,
+// e.g. the "cameras" list of a fused pose, are passed through, not interpolated.
+const KEYPOINTS = ['nose', 'left_wrist', 'right_wrist', 'left_index', 'right_index', 'left_shoulder', 'right_shoulder'];
+
+/**
+ * Small buffer of timestamped poses, rendered at a fixed delay behind the
+ * server clock so uneven arrival times don't show up as stutter.
+ */
+export class PoseInterpolator {
+    constructor(delay = 0.1, maxSize = 30) {
+        this.delay = delay; // Seconds behind "now" to render
+        this.maxSize = maxSize;
+        this.buffer = []; // Poses sorted by capture_time
+    }
+
+    push(pose) {
+        if (!pose || pose.capture_time === undefined) return;
+        const last = this.buffer[this.buffer.length - 1];
+        if (last && pose.capture_time <= last.capture_time) return; // Duplicate or out of order
+        this.buffer.push(pose);
+        if (this.buffer.length > this.maxSize) this.buffer.shift();
+    }
+
+    sample(serverNow) {
+        if (this.buffer.length === 0) return null;
+        const target = serverNow - this.delay;
+
+        // Drop poses we've moved past, keeping one before the target to interpolate from
+        while (this.buffer.length > 2 && this.buffer[1].capture_time <= target) {
+            this.buffer.shift();
+        }
+
+        const a = this.buffer[0];
+        const b = this.buffer[1];
+        if (!b || target <= a.capture_time) return a;
+        if (target >= b.capture_time) return b; // Buffer ran dry: hold, don't extrapolate
+
+        const t = (target - a.capture_time) / (b.capture_time - a.capture_time);
+        const pose = { ...b };
+        for (const key of KEYPOINTS) {
+            const from = a[key];
+            const to = b[key];
+            if (Array.isArray(to) && Array.isArray(from)) {
+                pose[key] = [from[0] + (to[0] - from[0]) * t, from[1] + (to[1] - from[1]) * t];
+            }
+        }
+        return pose;
+    }
+}
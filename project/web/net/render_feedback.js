@@ -0,0 +1,46 @@
+/**
+ * Reports how fast this display actually draws and how long it spends on
+ * each server message, so the backend can send it only what it can use:
+ * {type:'client_stats', fps, handle_ms} about once a second. The server
+ * answers {type:'adapt', rate, detail} whenever it changes our update rate.
+ */
+export class RenderFeedback {
+    constructor(interval = 1000) {
+        this.interval = interval; // ms between reports
+        this.reset(performance.now());
+    }
+
+    reset(now) {
+        this.since = now;
+        this.frames = 0;
+        this.messages = 0;
+        this.handleTime = 0; // ms spent parsing/handling messages since the last report
+    }
+
+    // Call once per drawn frame
+    frame() {
+        this.frames++;
+    }
+
+    // Runs a message handler and counts its cost
+    measure(handler) {
+        const start = performance.now();
+        handler();
+        this.handleTime += performance.now() - start;
+        this.messages++;
+    }
+
+    maybeReport(socket) {
+        const now = performance.now();
+        const elapsed = now - this.since;
+        if (elapsed < this.interval) return;
+        if (socket && socket.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify({
+                type: 'client_stats',
+                fps: this.frames * 1000 / elapsed,
+                handle_ms: this.messages ? this.handleTime / this.messages : 0,
+            }));
+        }
+        this.reset(now);
+    }
+}
@@ -7,14 +7,29 @@ import { RuneEffect } from './visuals/runes.js';
 import { ArtisticLayer } from './visuals/artistic_layer.js';
 import { NightSky } from './visuals/night_sky.js';
 import { BodySilhouette } from './visuals/body_silhouette.js';
+import { CalibrationOverlay } from './visuals/calibration_overlay.js';
+import { ClockSync, PoseInterpolator } from './net/clock_sync.js';
+import { RenderFeedback } from './net/render_feedback.js';
 
 // Configuration
-const WS_URL = 'ws://localhost:8765';
+// Display nodes fed by a relay open e.g. index.html?ws=ws://relay-host:8766
+const WS_URL = new URLSearchParams(window.location.search).get('ws')
+    || `ws://${window.location.hostname || 'localhost'}:8765`;
+
+// Poses are drawn this many seconds behind the server clock (?delay=0.1)
+const RENDER_DELAY = parseFloat(new URLSearchParams(window.location.search).get('delay') || '0.1');
+
+// Report render FPS so the backend adapts our update rate and detail (?adaptive=0 to opt out)
+const ADAPTIVE = new URLSearchParams(window.location.search).get('adaptive') !== '0';
 
 // State
 let socket;
 let lastPose = null;
-let particles, trails, trailsRight, aura, sparkles, ribbons, runes, artisticLayer, nightSky, bodySilhouette;
+const clockSync = new ClockSync();
+const poseBuffer = new PoseInterpolator(RENDER_DELAY);
+const feedback = new RenderFeedback();
+let pingTimer = null;
+let particles, trails, trailsRight, aura, sparkles, ribbons, runes, artisticLayer, nightSky, bodySilhouette, calibrationOverlay;
 let statusEl, fpsEl, loadingEl, debugPanel;
 let canvas;
 let lastSparkleTime = 0;
@@ -55,12 +70,15 @@ export const s = (p) => {
         runes = new RuneEffect(p);
         artisticLayer = new ArtisticLayer(p);
         bodySilhouette = new BodySilhouette(p);
+        calibrationOverlay = new CalibrationOverlay(p);
 
         // UI Elements
         statusEl = document.getElementById('status');
         fpsEl = document.getElementById('fps');
         loadingEl = document.getElementById('loading');
         debugPanel = document.getElementById('debug-panel');
+        // Shows the calibration targets to check the camera->projector alignment
+        document.getElementById('calibrate-btn').onclick = () => calibrationOverlay.toggleGrid();
 
         // Get audio element
         cosmicAudio = document.getElementById('cosmic-audio');
@@ -70,6 +88,15 @@ export const s = (p) => {
     };
 
     p.draw = () => {
+        feedback.frame();
+        if (ADAPTIVE) feedback.maybeReport(socket);
+
+        // Once the clock is synced, draw from the interpolation buffer at a fixed delay
+        if (clockSync.isSynced()) {
+            const pose = poseBuffer.sample(clockSync.serverNow());
+            if (pose) lastPose = pose;
+        }
+
         // Draw Night Sky Background (Opaque)
         nightSky.update();
         nightSky.display();
@@ -79,7 +106,7 @@ export const s = (p) => {
 
         // Update Effects
         if (lastPose) {
-            // Map normalized coordinates (0-1) to screen dimensions
+            // Coordinates arrive already mapped to the projector (0-1); just scale to the canvas
             // Right hand
             const rightX = lastPose.right_index[0] * p.width;
             const rightY = lastPose.right_index[1] * p.height;
@@ -123,7 +150,7 @@ export const s = (p) => {
 
         // Update and display all effects
         aura.display();
-        if (lastPose) bodySilhouette.display(lastPose); // Draw body silhouette
+        bodySilhouette.display(lastPose); // Segmentation outline if available, else skeleton
         // ribbons.display(); // DISABLED - was causing double trail when combined with sparkles
         trails.display();        // Left hand trail (cold colors)
         trailsRight.display();   // Right hand trail (warm colors)
@@ -135,6 +162,8 @@ export const s = (p) => {
         runes.update();       // DISABLED - pentagrams in center
         runes.display();      // DISABLED - pentagrams in center
 
+        calibrationOverlay.display(); // On top of everything while calibrating
+
         // FPS & Debug Panel Updates
         if (p.frameCount % 10 === 0) {
             fpsEl.innerText = Math.round(p.frameRate());
@@ -172,29 +201,77 @@ function connectWebSocket() {
         statusEl.innerText = 'Connected';
         statusEl.style.color = '#0f0';
         loadingEl.style.display = 'none';
+
+        // Optional per-display subscription, e.g. ?topics=pose,stats&rates=pose:5
+        const params = new URLSearchParams(window.location.search);
+        if (params.has('topics') || params.has('rates')) {
+            const subscribe = { type: 'subscribe', rates: {} };
+            if (params.has('topics')) subscribe.topics = params.get('topics').split(',');
+            (params.get('rates') || '').split(',').filter(Boolean).forEach(entry => {
+                const [topic, rate] = entry.split(':');
+                subscribe.rates[topic] = parseFloat(rate);
+            });
+            socket.send(JSON.stringify(subscribe));
+        }
+        // Draw the current state right away instead of waiting for the next change
+        socket.send(JSON.stringify({ type: 'snapshot' }));
+
+        // Quick burst of pings to sync the clock, then keep it fresh
+        for (let i = 0; i < 5; i++) {
+            setTimeout(() => clockSync.ping(socket), i * 100);
+        }
+        pingTimer = setInterval(() => clockSync.ping(socket), 2000);
     };
 
     socket.onclose = () => {
+        clearInterval(pingTimer);
         statusEl.innerText = 'Disconnected';
         statusEl.style.color = '#f00';
         setTimeout(connectWebSocket, 3000);
     };
 
     socket.onmessage = (event) => {
-        const data = JSON.parse(event.data);
-        if (data.type === 'update') {
-            handleUpdate(data);
-        } else if (data.type === 'texture_ready') {
-            console.log("New texture received:", data.url);
-            artisticLayer.loadImage(data.url);
-        } else if (data.type === 'status') {
-            statusEl.innerText = data.message;
-        }
+        feedback.measure(() => handleMessage(JSON.parse(event.data)));
     };
 }
 
+function handleMessage(data) {
+    if (data.type === 'update') {
+        handleUpdate(data);
+    } else if (data.type === 'adapt') {
+        // Fewer updates per second: render further behind so the buffer always has the next pose
+        poseBuffer.delay = data.rate ? Math.max(RENDER_DELAY, 1.5 / data.rate) : RENDER_DELAY;
+    } else if (data.type === 'pong') {
+        clockSync.handlePong(data);
+    } else if (data.type === 'snapshot') {
+        if (data.pose) lastPose = data.pose;
+        if (data.silhouette) bodySilhouette.setSilhouette(data.silhouette);
+        if (data.texture) artisticLayer.loadImage(data.texture.url);
+    } else if (data.type === 'calibration') {
+        calibrationOverlay.handleMessage(data);
+    } else if (data.type === 'texture_ready') {
+        console.log("New texture received:", data.url);
+        artisticLayer.loadImage(data.url);
+    } else if (data.type === 'status') {
+        statusEl.innerText = data.message;
+        // Keep the loading overlay up while the backend warms up its models
+        if (data.ready === false) {
+            loadingEl.innerText = data.message;
+            loadingEl.style.display = 'block';
+        } else {
+            loadingEl.style.display = 'none';
+        }
+    }
+}
+
 function handleUpdate(data) {
-    lastPose = data.pose;
+    // Rate-limited clients may get updates that only carry some topics
+    if (data.pose) {
+        poseBuffer.push(data.pose);
+        // Until the clock is synced, draw poses as they arrive
+        if (!clockSync.isSynced()) lastPose = data.pose;
+    }
+    if (data.silhouette) bodySilhouette.setSilhouette(data.silhouette);
     const commands = data.commands;
     const handsData = data.hands;
 
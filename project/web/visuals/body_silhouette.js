@@ -1,3 +1,27 @@
+/**
+ * Decodes a silhouette blob from the backend (see silhouette.py): base64 of
+ * little-endian uint16s, contour_count, then per contour point_count, x0, y0, ...
+ * Returns arrays of normalized [x, y] points.
+ */
+export function decodeContours(blob) {
+    const bytes = Uint8Array.from(atob(blob), c => c.charCodeAt(0));
+    const view = new DataView(bytes.buffer);
+    const contours = [];
+    let offset = 2;
+    const count = view.getUint16(0, true);
+    for (let i = 0; i < count; i++) {
+        const points = view.getUint16(offset, true);
+        offset += 2;
+        const contour = [];
+        for (let j = 0; j < points; j++) {
+            contour.push([view.getUint16(offset, true) / 65535, view.getUint16(offset + 2, true) / 65535]);
+            offset += 4;
+        }
+        contours.push(contour);
+    }
+    return contours;
+}
+
 export class BodySilhouette {
     constructor(p) {
         this.p = p;
@@ -28,9 +52,28 @@ export class BodySilhouette {
 
             // Head connections removed (triangle)
         ];
+
+        // Real outline from the backend's segmentation, when SILHOUETTE_FPS is on
+        this.contours = null;
+        this.contoursReceivedAt = 0;
+        this.contourTimeout = 1000; // ms without updates before falling back to the skeleton
+    }
+
+    setSilhouette(silhouette) {
+        if (!silhouette || !silhouette.contours) return;
+        this.contours = decodeContours(silhouette.contours);
+        this.contoursReceivedAt = performance.now();
+    }
+
+    hasContours() {
+        return this.contours !== null && performance.now() - this.contoursReceivedAt < this.contourTimeout;
     }
 
     display(poseData) {
+        if (this.hasContours()) {
+            this.displayContours();
+            return;
+        }
         if (!poseData) return;
 
         this.p.push();
@@ -53,6 +96,40 @@ export class BodySilhouette {
         this.p.pop();
     }
 
+    displayContours() {
+        this.p.push();
+        this.p.noFill();
+        this.p.blendMode(this.p.ADD);
+
+        // Same glow + vibrating core look as the skeleton
+        this.p.stroke(this.glowColor);
+        this.p.strokeWeight(this.strokeWeight * 5);
+        this.drawContours(false);
+
+        this.p.stroke(this.color);
+        this.p.strokeWeight(this.strokeWeight);
+        this.drawContours(true);
+
+        this.p.pop();
+    }
+
+    drawContours(addNoise) {
+        const time = this.p.frameCount * 0.2;
+        for (const contour of this.contours) {
+            this.p.beginShape();
+            for (const [nx, ny] of contour) {
+                let x = nx * this.p.width;
+                let y = ny * this.p.height;
+                if (addNoise) {
+                    x += this.p.noise(x * 0.01, time) * 4 - 2;
+                    y += this.p.noise(y * 0.01, time) * 4 - 2;
+                }
+                this.p.vertex(x, y);
+            }
+            this.p.endShape(this.p.CLOSE);
+        }
+    }
+
     drawSkeleton(pose, addNoise) {
         this.p.beginShape(this.p.LINES);
         for (let [start, end] of this.connections) {
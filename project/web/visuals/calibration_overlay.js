@@ -0,0 +1,46 @@
+/**
+ * Crosshairs for camera->projector calibration. The backend broadcasts
+ * {type: 'calibration', targets, active} while camera_viewer.py --calibrate
+ * runs; the "Calibrate Projector" button shows all targets to check alignment.
+ */
+export class CalibrationOverlay {
+    constructor(p) {
+        this.p = p;
+        this.targets = [];
+        this.active = null; // Index of the target being clicked, or null
+        this.showGrid = false;
+    }
+
+    handleMessage(msg) {
+        if (msg.targets) this.targets = msg.targets;
+        this.active = msg.active ?? null;
+    }
+
+    toggleGrid() {
+        this.showGrid = !this.showGrid;
+    }
+
+    display() {
+        if (this.active === null && !this.showGrid) return;
+
+        this.p.push();
+        this.p.blendMode(this.p.BLEND);
+        this.targets.forEach(([x, y], i) => {
+            if (i === this.active) {
+                this.drawCrosshair(x * this.p.width, y * this.p.height, 60, this.p.color(255, 255, 0));
+            } else if (this.showGrid) {
+                this.drawCrosshair(x * this.p.width, y * this.p.height, 30, this.p.color(255, 255, 255, 160));
+            }
+        });
+        this.p.pop();
+    }
+
+    drawCrosshair(x, y, size, color) {
+        this.p.stroke(color);
+        this.p.strokeWeight(2);
+        this.p.noFill();
+        this.p.line(x - size, y, x + size, y);
+        this.p.line(x, y - size, x, y + size);
+        this.p.circle(x, y, size);
+    }
+}